@@ -0,0 +1,40 @@
+import argparse
+import json
+
+from benchmarks.sitegen import SyntheticSite
+from crawler import AsyncCrawler
+import asyncio
+
+
+def run(pages: int, links: int, latency: float, depth: int, concurrency_levels):
+    results = []
+    with SyntheticSite(pages=pages, links_per_page=links, latency=latency) as site:
+        for concurrency in concurrency_levels:
+            crawler = AsyncCrawler(
+                max_depth=depth,
+                concurrency=concurrency,
+                per_host_concurrency=concurrency
+            )
+            asyncio.run(crawler.crawl(site.url))
+            stats = crawler.stats.as_dict()
+            stats["concurrency"] = concurrency
+            results.append(stats)
+            print(f"concurrency={concurrency:3d} pages={stats['pages']} "
+                  f"elapsed={stats['elapsed']:.2f}s pages/s={stats['pages_per_second']:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl throughput against a local synthetic site")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--links", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.pages, args.links, args.latency, args.depth, args.concurrency)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import warnings
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import rag
+from benchmarks.sitegen import SyntheticSite
+from benchmarks.stub_backend import StubOllama
+from crawler import crawl_relations
+from rag import GraphRAG
+
+SESSION = "bench"
+
+
+def crawl_depth(pages: int, links: int) -> int:
+    """Smallest depth at which a crawl from /page/0 reaches every page"""
+    depth, level, reached = 0, 1, 1
+    while reached < pages and links > 1:
+        level *= links
+        reached += level
+        depth += 1
+    return depth
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    if len(ms) == 0:
+        return {}
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def timed(calls) -> List[float]:
+    samples = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_size(pages: int, links: int, latency: float, queries: int, stub: StubOllama, workdir: str) -> Dict:
+    result = {"pages": pages}
+
+    with SyntheticSite(pages=pages, links_per_page=links, latency=latency) as site:
+        start = time.perf_counter()
+        documents, relations = crawl_relations(site.url, max_depth=crawl_depth(pages, links))
+        elapsed = time.perf_counter() - start
+    result["crawl"] = {
+        "pages": len(documents),
+        "relations": len(relations),
+        "seconds": elapsed,
+        "pages_per_second": len(documents) / elapsed if elapsed > 0 else 0.0,
+    }
+
+    graph_rag = GraphRAG(
+        vector_size=stub.dim,
+        kuzu_db_path=os.path.join(workdir, "kuzu"),
+        qdrant_path=os.path.join(workdir, "qdrant"),
+        embedding_cache_path=None,
+        lexical_index_path=os.path.join(workdir, "lexical"),
+        answer_cache_size=0
+    )
+    embed_calls = stub.embed_calls
+    start = time.perf_counter()
+    graph_rag.bulk_index_from_crawler(relations, documents, SESSION)
+    elapsed = time.perf_counter() - start
+    chunks = graph_rag.lexical_index.stats()["chunks"]
+    result["index"] = {
+        "documents": len(documents),
+        "chunks": chunks,
+        "seconds": elapsed,
+        "documents_per_second": len(documents) / elapsed if elapsed > 0 else 0.0,
+        "chunks_per_second": chunks / elapsed if elapsed > 0 else 0.0,
+        "embed_calls": stub.embed_calls - embed_calls,
+    }
+
+    # queries are a few words of a random crawled page, so each has a right answer
+    rng = random.Random(0)
+    urls = list(documents)
+    probes = []
+    for _ in range(queries):
+        url = rng.choice(urls)
+        words = [w for w in documents[url].split() if w.startswith("word")]
+        probes.append((url, " ".join(rng.sample(words, min(5, len(words))))))
+
+    vectors = [stub.vector(text) for _, text in probes]
+    result["qdrant_query"] = percentiles(timed(
+        lambda v=v: graph_rag.vector_db.query(v, limit=5, session_id=SESSION) for v in vectors
+    ))
+    result["kuzu_neighborhoods"] = percentiles(timed(
+        lambda u=u: graph_rag.graph_db.get_neighborhoods([u], SESSION, depth=graph_rag.max_graph_depth)
+        for u, _ in probes
+    ))
+    result["kuzu_latency"] = graph_rag.graph_db.latency_report()
+
+    chat_calls = stub.chat_calls
+    result["answer"] = percentiles(timed(
+        lambda q=q: graph_rag.answer(q, SESSION) for _, q in probes
+    ))
+    result["answer"]["generated"] = stub.chat_calls - chat_calls
+
+    graph_rag.vector_db.client.close()
+    return result
+
+
+def run(sizes: List[int], links: int, latency: float, queries: int, dim: int, chat_latency: float) -> List[Dict]:
+    stub = StubOllama(dim=dim, chat_latency=chat_latency)
+    previous = rag.ollama
+    rag.ollama = stub
+    results = []
+    try:
+        for pages in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                result = run_size(pages, links, latency, queries, stub, tmp)
+            results.append(result)
+            print(f"pages={pages:5d} crawl={result['crawl']['pages_per_second']:.1f} pages/s "
+                  f"index={result['index']['chunks_per_second']:.1f} chunks/s "
+                  f"qdrant p50={result['qdrant_query'].get('p50_ms', 0):.2f}ms "
+                  f"kuzu p50={result['kuzu_neighborhoods'].get('p50_ms', 0):.2f}ms "
+                  f"answer p50={result['answer'].get('p50_ms', 0):.2f}ms "
+                  f"p99={result['answer'].get('p99_ms', 0):.2f}ms")
+    finally:
+        rag.ollama = previous
+    return results
+
+
+def flatten(result: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = float(value)
+    return flat
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float = 0.1):
+    """Print metrics that moved more than `threshold` against a baseline run of the same sizes"""
+    previous = {run["pages"]: flatten(run) for run in baseline}
+    for run in results:
+        old = previous.get(run["pages"])
+        if old is None:
+            continue
+        for key, value in flatten(run).items():
+            before = old.get(key)
+            if not before or key.endswith(("pages", "relations", "documents", "chunks")):
+                continue
+            change = value / before - 1.0
+            if abs(change) < threshold:
+                continue
+            # throughput should go up, everything else (latencies, seconds, calls) down
+            better = change > 0 if key.endswith("per_second") else change < 0
+            print(f"pages={run['pages']:5d} {key}: {before:.3f} -> {value:.3f} "
+                  f"({change:+.0%}, {'better' if better else 'WORSE'})")
+
+
+def load_results(path: Optional[str]) -> Optional[List[Dict]]:
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end crawl, index and query benchmark with a stub model backend")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000], help="corpus sizes in pages")
+    parser.add_argument("--links", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="synthetic site delay per request")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--chat-latency", type=float, default=0.0, help="stub LLM delay per answer")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    results = run(args.sizes, args.links, args.latency, args.queries, args.dim, args.chat_latency)
+    baseline = load_results(args.baseline)
+    if baseline is not None:
+        compare(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
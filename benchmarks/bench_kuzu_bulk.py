@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from db.KuzuDB import KuzuDB
+
+
+def run(nodes: int, fanout: int):
+    links = [f"http://example.com/page/{i}" for i in range(nodes)]
+    rels = [(links[i], links[(i * fanout + k) % nodes]) for i in range(nodes) for k in range(1, fanout + 1)]
+    results = {"nodes": nodes, "rels": len(rels)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = KuzuDB(os.path.join(tmp, "per_row"))
+        start = time.perf_counter()
+        for link in links:
+            db.insert_node(link, "bench")
+        results["per_row_nodes_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        for src, dst in rels:
+            db.insert_rel(src, dst, "bench")
+        results["per_row_rels_s"] = time.perf_counter() - start
+        del db
+
+        db = KuzuDB(os.path.join(tmp, "bulk"))
+        start = time.perf_counter()
+        db.insert_nodes(links, "bench")
+        results["bulk_nodes_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        db.insert_rels(rels, "bench")
+        results["bulk_rels_s"] = time.perf_counter() - start
+        del db
+
+    print(f"{nodes} nodes: per-row {results['per_row_nodes_s']:.2f}s, bulk {results['bulk_nodes_s']:.2f}s")
+    print(f"{len(rels)} rels: per-row {results['per_row_rels_s']:.2f}s, bulk {results['bulk_rels_s']:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-row and bulk KuzuDB ingestion")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [run(n, args.fanout) for n in args.nodes]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
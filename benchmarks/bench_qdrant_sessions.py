@@ -0,0 +1,59 @@
+import argparse
+import json
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from db.QdrantDB import QdrantDB
+
+
+def run(session_counts, points_per_session: int, dim: int, queries: int):
+    rng = np.random.default_rng(0)
+    results = []
+    for partitioned in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = QdrantDB(path=tmp, vector_size=dim, partition_by_session=partitioned)
+            loaded = 0
+            for sessions in session_counts:
+                for s in range(loaded, sessions):
+                    vectors = rng.random((points_per_session, dim), dtype=np.float32)
+                    db.upsert_points(
+                        [f"s{s}_{i}" for i in range(points_per_session)],
+                        vectors.tolist(),
+                        [{"session_id": f"s{s}", "url": f"http://s{s}/{i}", "doc_id": f"s{s}"}
+                         for i in range(points_per_session)]
+                    )
+                loaded = sessions
+
+                probes = rng.random((queries, dim), dtype=np.float32)
+                start = time.perf_counter()
+                for q in probes:
+                    db.query(q.tolist(), limit=5, session_id="s0")
+                elapsed = (time.perf_counter() - start) / queries
+                results.append({
+                    "partitioned": partitioned,
+                    "sessions": sessions,
+                    "points": sessions * points_per_session,
+                    "query_ms": elapsed * 1000.0,
+                })
+                print(f"partitioned={partitioned!s:5} sessions={sessions:4d} query={elapsed * 1000.0:.2f}ms")
+            db.client.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session-scoped query latency as sessions accumulate")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--points", type=int, default=200, help="points per session")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    results = run(args.sessions, args.points, args.dim, args.queries)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
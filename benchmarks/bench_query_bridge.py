@@ -0,0 +1,56 @@
+import argparse
+import json
+import time
+
+from query_bridge import QueryBridge
+
+QUERIES = [
+    "What is artificial intelligence?",
+    "How do solar panels generate electricity?",
+    "Tell me about quantum computing",
+    "Why is the sky blue?",
+    "Which of the crawled pages explain the graph traversal depth and how is it configured?",
+    "AI",
+]
+
+
+def run(constructions: int, queries: int):
+    start = time.perf_counter()
+    for _ in range(constructions):
+        QueryBridge()
+    construct_us = (time.perf_counter() - start) / constructions * 1e6
+
+    bridge = QueryBridge()
+    batch = (QUERIES * (queries // len(QUERIES) + 1))[:queries]
+
+    start = time.perf_counter()
+    for query in batch:
+        bridge.transform(query)
+    transform_us = (time.perf_counter() - start) / len(batch) * 1e6
+
+    start = time.perf_counter()
+    bridge.transform_many(batch)
+    transform_many_us = (time.perf_counter() - start) / len(batch) * 1e6
+
+    result = {
+        "construct_us": construct_us,
+        "transform_us": transform_us,
+        "transform_many_us": transform_many_us,
+        "queries": len(batch),
+    }
+    print(f"construct={construct_us:.2f}us transform={transform_us:.2f}us/query "
+          f"transform_many={transform_many_us:.2f}us/query")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="QueryBridge construction and per-query cost")
+    parser.add_argument("--constructions", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = run(args.constructions, args.queries)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
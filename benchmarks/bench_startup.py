@@ -0,0 +1,60 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+TARGETS = ["rag", "main", "scripts.init_databases"]
+# numpy is needed by rag itself and stays eager; it is listed so the report shows its cost
+HEAVY = ["numpy", "qdrant_client", "kuzu", "ollama", "semchunk", "nltk"]
+
+# run in a fresh interpreter so every import is cold for this process;
+# a lazy module shows up in sys.modules but has not been executed yet
+PROBE = """
+import sys, time, importlib
+start = time.perf_counter()
+importlib.import_module({target!r})
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules and type(sys.modules[m]).__name__ != "_LazyModule"]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def measure(target: str, runs: int):
+    timings, loaded = [], ""
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(target=target, heavy=HEAVY)],
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        timings.append(float(out[0]) * 1000)
+        loaded = out[1] if len(out) > 1 else ""
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "loaded": [m for m in loaded.split(",") if m],
+    }
+
+
+def run(runs: int):
+    result = {}
+    for target in TARGETS:
+        start = time.perf_counter()
+        result[target] = measure(target, runs)
+        stats = result[target]
+        print(f"import {target}: median={stats['median_ms']:.1f}ms min={stats['min_ms']:.1f}ms "
+              f"heavy={','.join(stats['loaded']) or '-'} ({time.perf_counter() - start:.1f}s)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import time of the package entry points")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = run(args.runs)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,209 @@
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SyntheticSite:
+    """
+    Deterministic link-heavy site served from a local HTTP server.
+
+    Page i links to pages i*links_per_page+1 .. i*links_per_page+links_per_page
+    (mod `pages`), so the site fans out like a tree from /page/0. `latency` adds a fixed delay per request
+    to mimic network wait.
+
+    With `validators` every page carries an ETag and answers If-None-Match
+    with 304 Not Modified. `touch(i)` changes page i so recrawls see an edit.
+
+    `distinct_bodies` makes page i reuse the body text of page
+    i % distinct_bodies (mirrored pages), and `link_variants` adds a
+    fragment/tracking-parameter variant of every link.
+
+    `robots` is served as /robots.txt (404 when None). `request_times`
+    records (perf_counter, path) for every request, to check politeness.
+    """
+
+    def __init__(
+        self,
+        pages: int = 100,
+        links_per_page: int = 10,
+        latency: float = 0.0,
+        words: int = 200,
+        validators: bool = True,
+        distinct_bodies: int = 0,
+        link_variants: bool = False,
+        robots: Optional[str] = None
+    ):
+        self.pages = pages
+        self.links_per_page = links_per_page
+        self.latency = latency
+        self.words = words
+        self.validators = validators
+        self.distinct_bodies = distinct_bodies
+        self.link_variants = link_variants
+        self.robots = robots
+        self.revisions = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.request_times: List[Tuple[float, str]] = []
+        self._server = None
+        self._thread = None
+
+    def render(self, i: int) -> str:
+        links = "".join(
+            f'<a href="/page/{(i * self.links_per_page + k) % self.pages}">link {k}</a> '
+            for k in range(1, self.links_per_page + 1)
+        )
+        if self.link_variants:
+            links += "".join(
+                f'<a href="/page/{(i * self.links_per_page + k) % self.pages}/?utm_source=bench#top">again {k}</a> '
+                for k in range(1, self.links_per_page + 1)
+            )
+        rng = random.Random(i % self.distinct_bodies if self.distinct_bodies else i)
+        body = " ".join(f"word{rng.randrange(997)}" for _ in range(self.words))
+        revision = self.revisions.get(i, 0)
+        if revision:
+            body += f" revision{revision}"
+        return (
+            f"<html><head><title>Page {i}</title><style>p {{}}</style></head>"
+            f"<body><h1>Page {i}</h1><p>{body}</p>{links}"
+            f"<script>var x = {i};</script></body></html>"
+        )
+
+    def touch(self, i: int):
+        """Edit page i"""
+        self.revisions[i] = self.revisions.get(i, 0) + 1
+
+    def etag(self, i: int) -> str:
+        return f'"{i}-{self.revisions.get(i, 0)}"'
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/page/0"
+
+    def start(self) -> "SyntheticSite":
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests += 1
+                site.request_times.append((time.perf_counter(), self.path))
+                if self.path == "/robots.txt":
+                    self._robots()
+                    return
+                if site.latency:
+                    time.sleep(site.latency)
+                try:
+                    i = int(urlsplit(self.path).path.rstrip("/").rsplit("/", 1)[-1])
+                except ValueError:
+                    i = -1
+                if not 0 <= i < site.pages:
+                    self.send_error(404)
+                    return
+                etag = site.etag(i)
+                if site.validators and self.headers.get("If-None-Match") == etag:
+                    site.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                body = site.render(i).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                if site.validators:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _robots(self):
+                if site.robots is None:
+                    self.send_error(404)
+                    return
+                body = site.robots.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 256
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StaticSite:
+    """
+    Serves fixed HTML `pages` ({path: html}) from a local HTTP server
+
+    Any other path is a 404. `paths` lists every requested path in order.
+    """
+
+    def __init__(self, pages: Dict[str, str]):
+        self.pages = pages
+        self.paths: List[str] = []
+        self._server = None
+
+    def url(self, path: str = "/") -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self) -> "StaticSite":
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.paths.append(self.path)
+                html = site.pages.get(self.path)
+                if html is None:
+                    self.send_error(404)
+                    return
+                body = html.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,77 @@
+import hashlib
+import re
+import time
+from typing import Dict, Iterator, List, Union
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class StubOllama:
+    """
+    Deterministic stand-in for the `ollama` module, so benchmarks measure
+    this project's code instead of a model server.
+
+    `embed` hashes every token into one of `dim` buckets (with a hashed
+    sign) and L2-normalizes the counts, so texts sharing words land near
+    each other and vector search still finds the right pages. `chat`
+    answers with the first `answer_words` words of the context, streamed
+    one word per part when asked. `embed_latency` and `chat_latency` add a
+    fixed delay per call to mimic model time.
+    """
+
+    def __init__(self, dim: int = 256, embed_latency: float = 0.0, chat_latency: float = 0.0, answer_words: int = 32):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.answer_words = answer_words
+        self.embed_calls = 0
+        self.chat_calls = 0
+        self._buckets: Dict[str, tuple] = {}
+
+    def _bucket(self, token: str) -> tuple:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = self._buckets[token] = (digest % self.dim, 1.0 if digest >> 63 else -1.0)
+        return bucket
+
+    def vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            index, sign = self._bucket(token)
+            vector[index] += sign
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            vector[0] = 1.0
+            return vector
+        return vector / norm
+
+    def embed(self, model: str, input: Union[str, List[str]]) -> Dict[str, list]:
+        self.embed_calls += 1
+        if self.embed_latency:
+            time.sleep(self.embed_latency)
+        texts = [input] if isinstance(input, str) else input
+        return {"embeddings": [self.vector(text).tolist() for text in texts]}
+
+    def _answer(self, messages: List[Dict[str, str]]) -> List[str]:
+        context = messages[-1]["content"] if messages else ""
+        return context.split()[:self.answer_words]
+
+    def chat(self, model: str, messages: List[Dict[str, str]], stream: bool = False):
+        self.chat_calls += 1
+        if self.chat_latency:
+            time.sleep(self.chat_latency)
+        words = self._answer(messages)
+        if stream:
+            return self._stream(words)
+        return {"message": {"content": " ".join(words)}}
+
+    @staticmethod
+    def _stream(words: List[str]) -> Iterator[Dict[str, Dict[str, str]]]:
+        for word in words:
+            yield {"message": {"content": word + " "}}
+
+    # GraphRAG.open() touches ollama.Client to load the client library early
+    Client = object
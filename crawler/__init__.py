@@ -1,56 +1,55 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import sys
-if hasattr(sys.stdout, "reconfigure"):
-    sys.stdout.reconfigure(encoding="utf-8")
-
-def get_plain_text(html):
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "style"]): tag.decompose()
-    text = soup.get_text(separator=' ', strip=True)
-    return text
-
-def extract_links(base_url, html):
-    soup = BeautifulSoup(html, "html.parser")
-    links = set()
-    for a_tag in soup.find_all("a", href=True):
-        href = a_tag.get("href")
-        url = urljoin(base_url, href)
-        if urlparse(url).scheme in ["http", "https"]:
-            links.add(url)
-    return links
-
-def crawl_relations(url, max_depth=2):
-    visited = set()
-    link_text_map = dict()
-    relations = []
-
-    def _crawl(current_url, depth, parent=None):
-        if depth > max_depth or current_url in visited:
-            return
-        try:
-            resp = requests.get(current_url, timeout=10)
-            resp.raise_for_status()
-            html = resp.text
-            plain_text = get_plain_text(html)
-            link_text_map[current_url] = plain_text
-            visited.add(current_url)
-            if parent is not None:
-                relations.append((parent, current_url))
-            if depth < max_depth:
-                links = extract_links(current_url, html)
-                for link in links:
-                    _crawl(link, depth + 1, current_url)
-        except Exception:
-            pass  # skip broken
-
-    _crawl(url, 0, None)
-    return [link_text_map, relations]
-
-# Usage:
-if __name__ == "__main__":
-    start_url = "http://127.0.0.1:5000"
-    results = crawl_relations(start_url, max_depth=2)
-    # Output: [{'link1': 'text1', ...}, [(link1, link2), ...]]
-    print(results)
+import asyncio
+import sys
+from crawler.parse import PARSER, ParsedPage, parse_page
+from crawler.engine import AsyncCrawler, CrawlStats
+from crawler.state import CrawlStateStore, PageState
+from crawler.urls import canonicalize_url
+from crawler.dedup import NearDuplicateIndex, simhash
+from crawler.scheduler import CrawlBudget, CrawlJob, CrawlScheduler, link_score
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8")
+
+def get_plain_text(html):
+    return parse_page("", html).text
+
+def extract_links(base_url, html):
+    return parse_page(base_url, html).links
+
+def crawl_relations(url, max_depth=2, concurrency=16, per_host_concurrency=8, parse_workers=None, state=None):
+    return asyncio.run(crawl_relations_async(
+        url,
+        max_depth=max_depth,
+        concurrency=concurrency,
+        per_host_concurrency=per_host_concurrency,
+        parse_workers=parse_workers,
+        state=state
+    ))
+
+async def crawl_relations_async(url, max_depth=2, concurrency=16, per_host_concurrency=8, parse_workers=None, state=None):
+    crawler = AsyncCrawler(
+        max_depth=max_depth,
+        concurrency=concurrency,
+        per_host_concurrency=per_host_concurrency,
+        parse_workers=parse_workers,
+        state=state
+    )
+    return await crawler.crawl(url)
+
+def crawl_sessions(seeds, max_depth=2, budget=None, **scheduler_options):
+    """
+    Crawl several sessions at once on a shared, polite worker pool.
+
+    `seeds` maps session_id -> list of start URLs. Returns
+    {session_id: [link_text_map, relations]}; see CrawlScheduler.
+    """
+    scheduler = CrawlScheduler(**scheduler_options)
+    for session_id, urls in seeds.items():
+        scheduler.add(session_id, urls, max_depth=max_depth, budget=budget)
+    return asyncio.run(scheduler.run())
+
+# Usage:
+if __name__ == "__main__":
+    start_url = "http://127.0.0.1:5000"
+    results = crawl_relations(start_url, max_depth=2)
+    # Output: [{'link1': 'text1', ...}, [(link1, link2), ...]]
+    print(results)
@@ -0,0 +1,74 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+_BITS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """
+    64-bit SimHash of a text over word shingles, 0 for text without words.
+
+    Texts that share most of their shingles get fingerprints that differ in
+    only a few bits. Shingles are hashed with blake2b so fingerprints agree
+    across the crawler's parse processes.
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0
+    grams = [" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))]
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") for g in grams),
+        dtype=np.uint64,
+        count=len(grams)
+    )
+    ones = ((hashes[:, None] >> _BITS) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+    bits = np.packbits(ones * 2 > len(grams), bitorder="little")
+    return int.from_bytes(bits.tobytes(), "little")
+
+
+class NearDuplicateIndex:
+    """
+    Finds pages whose SimHash is within `max_distance` bits of one seen before.
+
+    Fingerprints are split into max_distance + 1 bands; two fingerprints that
+    differ in at most max_distance bits must agree on at least one whole band,
+    so only pages sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = 64 // bands
+        self._bands = [(i * width, (1 << width) - 1 if i < bands - 1 else (1 << (64 - i * width)) - 1)
+                       for i in range(bands)]
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self._urls: Dict[int, str] = {}
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """URL of a stored page near `fingerprint`, else None"""
+        for (shift, mask), table in zip(self._bands, self._tables):
+            for other in table.get((fingerprint >> shift) & mask, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return self._urls[other]
+        return None
+
+    def add(self, fingerprint: int, url: str):
+        if fingerprint in self._urls:
+            return
+        self._urls[fingerprint] = url
+        for (shift, mask), table in zip(self._bands, self._tables):
+            table.setdefault((fingerprint >> shift) & mask, []).append(fingerprint)
+
+    def check(self, fingerprint: int, url: str) -> Optional[str]:
+        """Return the page `url` duplicates, or record it and return None"""
+        original = self.find(fingerprint)
+        if original is None:
+            self.add(fingerprint, url)
+        return original
+
+    def __len__(self) -> int:
+        return len(self._urls)
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from crawler.dedup import NearDuplicateIndex
+from crawler.parse import ParsedPage, parse_page
+from crawler.state import CrawlStateStore
+from crawler.urls import canonicalize_url
+
+
+class CrawlStats:
+    """Counters collected during a single crawl"""
+
+    def __init__(self):
+        self.pages = 0
+        self.unchanged = 0
+        self.not_modified = 0
+        self.saved_fetches = 0
+        self.near_duplicates = 0
+        self.robots_blocked = 0
+        self.bytes = 0
+        self.errors = 0
+        self.started = 0.0
+        self.finished = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished or time.perf_counter()
+        return end - self.started if self.started else 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "pages": self.pages,
+            "unchanged": self.unchanged,
+            "not_modified": self.not_modified,
+            "saved_fetches": self.saved_fetches,
+            "near_duplicates": self.near_duplicates,
+            "robots_blocked": self.robots_blocked,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "pages_per_second": self.pages_per_second,
+        }
+
+
+class AsyncCrawler:
+    """
+    Breadth-first crawler backed by a bounded pool of asyncio workers.
+
+    All requests go through one connection-pooled httpx client. The number of
+    in-flight requests is capped globally by `concurrency` and per host by
+    `per_host_concurrency`.
+
+    HTML parsing is CPU bound, so it runs in a pool of `parse_workers`
+    processes (default: min(4, cpu count)). Set `parse_workers=0` to parse
+    inline on the event loop, which is only worth it for tiny crawls.
+
+    With a CrawlStateStore as `state`, pages crawled before are requested
+    conditionally (If-None-Match / If-Modified-Since). A page that answers
+    304 Not Modified, or whose body hashes the same as last time, is not
+    parsed or reported; the crawl still follows its stored links. Fetched
+    pages are only staged in `state`: they are recorded when an `on_page`
+    callback returns True, or when the consumer of the crawl calls
+    `state.commit(url)` after indexing them, so a page that failed to index
+    is fetched in full again next time.
+
+    Links are canonicalized (see `canonicalize_url`) before the visited
+    check, and `saved_fetches` counts the variants that were folded into a
+    page already queued. Pages are reported under their canonical URL, but
+    fetched as linked and parsed against the final response URL, so
+    relative links on directory pages ("/docs/") resolve as a browser
+    would. Unless `dedup_distance` is None, a page whose text SimHash is
+    within that many bits of an earlier page is dropped as a near
+    duplicate: it is not reported and its links are not followed, and
+    `near_duplicates` counts the pages kept out of chunking and embedding.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 2,
+        concurrency: int = 16,
+        per_host_concurrency: int = 8,
+        timeout: float = 10.0,
+        headers: Optional[Dict[str, str]] = None,
+        parse_workers: Optional[int] = None,
+        state: Optional[CrawlStateStore] = None,
+        dedup_distance: Optional[int] = 3
+    ):
+        self.max_depth = max_depth
+        self.concurrency = max(1, concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.timeout = timeout
+        self.headers = headers or {}
+        if parse_workers is None:
+            parse_workers = min(4, os.cpu_count() or 1)
+        self.parse_workers = parse_workers
+        self.state = state
+        self.dedup_distance = dedup_distance
+        self.stats = CrawlStats()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.per_host_concurrency)
+            self._host_limits[host] = sem
+        return sem
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str, key: str) -> httpx.Response:
+        """GET `url` as it was linked; `key` is its canonical form, under which crawl state is kept"""
+        headers = self.state.conditional_headers(key) if self.state is not None else None
+        async with self._host_limit(url):
+            resp = await client.get(url, headers=headers)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        self.stats.bytes += len(resp.content)
+        return resp
+
+    def _unchanged_links(self, url: str, resp: httpx.Response) -> Optional[List[str]]:
+        """Stored links of a page that has not changed since the last crawl, else None"""
+        if self.state is None:
+            return None
+        previous = self.state.get(url)
+        if previous is None:
+            return None
+        if resp.status_code == 304:
+            self.stats.not_modified += 1
+        elif CrawlStateStore.content_hash(resp.content) != previous.content_hash:
+            return None
+        self.state.touch(url, resp.headers.get("etag"), resp.headers.get("last-modified"))
+        self.stats.unchanged += 1
+        return previous.links
+
+    async def _parse(self, pool: Optional[Executor], url: str, html: str) -> ParsedPage:
+        fingerprint = self.dedup_distance is not None
+        if pool is None:
+            return parse_page(url, html, fingerprint)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, parse_page, url, html, fingerprint)
+
+    async def crawl(
+        self,
+        start_url: str,
+        on_page: Optional[Callable[[str, ParsedPage, Optional[str]], Awaitable[Optional[bool]]]] = None
+    ) -> List:
+        """
+        Crawl from `start_url` down to `max_depth`.
+
+        Returns [link_text_map, relations] like `crawl_relations`. If `on_page`
+        is given it is awaited as on_page(url, page, parent) for every fetched
+        page and nothing is accumulated, so both returned collections are
+        empty; a slow callback holds back the worker that fetched the page.
+        Returning True from `on_page` confirms the page for `state`.
+
+        Pages found unchanged through `state` are left out of link_text_map
+        and never passed to `on_page`, but their edge from the parent is
+        still listed in relations. Near duplicates are left out of both.
+        """
+        self.stats = CrawlStats()
+        self.stats.started = time.perf_counter()
+        self._host_limits = {}
+        start_key = canonicalize_url(start_url)
+        duplicates = NearDuplicateIndex(self.dedup_distance) if self.dedup_distance is not None else None
+
+        visited: Set[str] = {start_key}
+        seen_links: Set[str] = {start_url}
+        link_text_map: Dict[str, str] = dict()
+        relations: List[Tuple[str, str]] = []
+        queue: asyncio.Queue = asyncio.Queue()
+        next_frontier: List[Tuple[str, str]] = []
+
+        async def worker(client: httpx.AsyncClient, pool: Optional[Executor]):
+            while True:
+                fetch_url, current_url, depth, parent = await queue.get()
+                try:
+                    resp = await self._fetch(client, fetch_url, current_url)
+                    links = self._unchanged_links(current_url, resp)
+                    if links is None:
+                        page = await self._parse(pool, str(resp.url), resp.text)
+                        links = page.links
+                        self.stats.pages += 1
+                        duplicate = bool(page.fingerprint) and duplicates.check(page.fingerprint, current_url) is not None
+                        if self.state is not None:
+                            # pages count as crawled once their consumer has indexed them
+                            record = self.state.put if duplicate else self.state.stage
+                            record(
+                                current_url,
+                                resp.headers.get("etag", ""),
+                                resp.headers.get("last-modified", ""),
+                                CrawlStateStore.content_hash(resp.content),
+                                [] if duplicate else links
+                            )
+                        if duplicate:
+                            self.stats.near_duplicates += 1
+                            continue
+                        if on_page is not None:
+                            if await on_page(current_url, page, parent) is True and self.state is not None:
+                                self.state.commit(current_url)
+                        else:
+                            link_text_map[current_url] = page.text
+                    if on_page is None and parent is not None:
+                        relations.append((parent, current_url))
+                    if depth < self.max_depth:
+                        for link in links:
+                            next_frontier.append((link, current_url))
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self.stats.errors += 1  # skip broken
+                finally:
+                    queue.task_done()
+
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency
+        )
+        async with httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout,
+            headers=self.headers,
+            follow_redirects=True
+        ) as client:
+            pool = ProcessPoolExecutor(self.parse_workers) if self.parse_workers > 0 else None
+            workers = [asyncio.create_task(worker(client, pool)) for _ in range(self.concurrency)]
+            try:
+                frontier = [(start_url, start_key, None)]
+                depth = 0
+                while frontier and depth <= self.max_depth:
+                    for fetch_url, current_url, parent in frontier:
+                        queue.put_nowait((fetch_url, current_url, depth, parent))
+                    await queue.join()
+
+                    frontier = []
+                    for link, parent in next_frontier:
+                        if link in seen_links:
+                            continue
+                        seen_links.add(link)
+                        canonical = canonicalize_url(link)
+                        if canonical in visited:
+                            self.stats.saved_fetches += 1
+                            continue
+                        visited.add(canonical)
+                        frontier.append((link, canonical, parent))
+                    next_frontier.clear()
+                    depth += 1
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                if self.state is not None:
+                    self.state.flush()
+
+        self.stats.finished = time.perf_counter()
+        return [link_text_map, relations]
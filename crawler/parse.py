@@ -0,0 +1,43 @@
+from typing import NamedTuple, Set
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from crawler.dedup import simhash
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+
+class ParsedPage(NamedTuple):
+    text: str
+    links: Set[str]
+    title: str
+    fingerprint: int = 0
+
+
+def parse_page(base_url: str, html: str, fingerprint: bool = False) -> ParsedPage:
+    """
+    Parse a document once and pull out its plain text, outgoing links and title
+
+    With `fingerprint` the SimHash of the text is computed as well, so the
+    work happens in the parse worker rather than on the event loop.
+    """
+    soup = BeautifulSoup(html, PARSER)
+
+    title = ""
+    if soup.title is not None and soup.title.string:
+        title = soup.title.string.strip()
+
+    links = set()
+    for a_tag in soup.find_all("a", href=True):
+        url = urljoin(base_url, a_tag.get("href"))
+        if urlparse(url).scheme in ["http", "https"]:
+            links.add(url)
+
+    for tag in soup(["script", "style"]): tag.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    return ParsedPage(text, links, title, simhash(text) if fingerprint else 0)
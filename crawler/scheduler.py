@@ -0,0 +1,375 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from crawler.dedup import NearDuplicateIndex
+from crawler.engine import CrawlStats
+from crawler.parse import ParsedPage, parse_page
+from crawler.urls import canonicalize_url
+
+# frontier entries scanned per dispatch before giving the turn to the next session
+_SCAN_LIMIT = 64
+
+
+def origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def link_score(url: str, parent: str) -> float:
+    """Default frontier score: stay on the parent's site, prefer shallow paths"""
+    same_site = 1.0 if origin(url) == origin(parent) else 0.0
+    segments = len([s for s in urlsplit(url).path.split("/") if s])
+    return same_site - 0.05 * segments
+
+
+class CrawlBudget(NamedTuple):
+    """Per-session limits; None means unlimited"""
+    max_pages: Optional[int] = None
+    max_bytes: Optional[int] = None
+    max_seconds: Optional[float] = None
+
+
+class CrawlJob:
+    """
+    Seeds, limits and results of one session inside a CrawlScheduler.
+
+    The frontier is a heap ordered by (depth, -score), so a session goes
+    through its seeds level by level and takes the best-scored links of a
+    level first. Pages are reported under their canonical URL but fetched
+    as linked, like AsyncCrawler. Once a budget runs out the frontier is
+    dropped, pages already in flight still finish, and `exhausted` names
+    the budget.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        seeds: Iterable[str],
+        max_depth: int = 2,
+        budget: Optional[CrawlBudget] = None,
+        on_page: Optional[Callable[[str, ParsedPage, Optional[str]], Awaitable[None]]] = None,
+        dedup_distance: Optional[int] = 3
+    ):
+        self.session_id = session_id
+        self.seeds = list(dict.fromkeys(seed.strip() for seed in seeds))
+        self.max_depth = max_depth
+        self.budget = budget or CrawlBudget()
+        self.on_page = on_page
+        self.stats = CrawlStats()
+        self.exhausted: Optional[str] = None
+        self.link_text_map: Dict[str, str] = {}
+        self.relations: List[Tuple[str, str]] = []
+        self.duplicates = NearDuplicateIndex(dedup_distance) if dedup_distance is not None else None
+        # (depth, -score, order, canonical url, url as linked, canonical parent)
+        self.frontier: List[Tuple[int, float, int, str, str, Optional[str]]] = []
+        self.in_flight = 0
+        self._seen: Set[str] = set()
+        self._visited: Set[str] = set()
+        self._order = itertools.count()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.frontier) or self.in_flight > 0
+
+    @property
+    def deadline(self) -> Optional[float]:
+        if self.budget.max_seconds is None or not self.stats.started:
+            return None
+        return self.stats.started + self.budget.max_seconds
+
+    def push(self, url: str, depth: int, parent: Optional[str], score: float):
+        if url in self._seen:
+            return
+        self._seen.add(url)
+        canonical = canonicalize_url(url)
+        if canonical in self._visited:
+            self.stats.saved_fetches += 1
+            return
+        self._visited.add(canonical)
+        heapq.heappush(self.frontier, (depth, -score, next(self._order), canonical, url, parent))
+
+    def stop(self, reason: str):
+        if self.exhausted is None:
+            self.exhausted = reason
+        self.frontier.clear()
+
+    def result(self) -> List:
+        return [self.link_text_map, self.relations]
+
+
+class CrawlScheduler:
+    """
+    Crawls many sessions, each from several seeds, on one shared worker pool.
+
+    Sessions are added with `add()` and crawled together by `run()`. Free
+    workers take the next session in round-robin order, so a session with a
+    huge site cannot starve the others; within a session the frontier is a
+    priority queue (see CrawlJob).
+
+    Politeness is per origin (scheme://host:port): at most
+    `per_host_concurrency` requests in flight, and requests start at least
+    `min_delay` seconds apart, or the robots.txt Crawl-delay (whole
+    seconds, as urllib.robotparser reads it) if that is longer. robots.txt
+    is fetched once per origin before its first page and disallowed URLs
+    are skipped (`robots_blocked`); a missing robots.txt allows everything,
+    401/403 disallows everything.
+
+    Fetching, parsing (in `parse_workers` processes) and near-duplicate
+    detection work like AsyncCrawler.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        per_host_concurrency: int = 2,
+        min_delay: float = 0.25,
+        timeout: float = 10.0,
+        user_agent: str = "ArabellaBot",
+        headers: Optional[Dict[str, str]] = None,
+        respect_robots: bool = True,
+        parse_workers: Optional[int] = None,
+        dedup_distance: Optional[int] = 3,
+        score: Callable[[str, str], float] = link_score
+    ):
+        self.concurrency = max(1, concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.min_delay = max(0.0, min_delay)
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.headers = {"User-Agent": user_agent, **(headers or {})}
+        self.respect_robots = respect_robots
+        if parse_workers is None:
+            parse_workers = min(4, os.cpu_count() or 1)
+        self.parse_workers = parse_workers
+        self.dedup_distance = dedup_distance
+        self.score = score
+        self.jobs: Dict[str, CrawlJob] = {}
+        self._turn = 0
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._host_delay: Dict[str, float] = {}
+        self._host_next: Dict[str, float] = {}
+        self._host_active: Dict[str, int] = {}
+        self._robot_tasks: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self._wakeup: Optional[asyncio.Condition] = None
+
+    def add(
+        self,
+        session_id: str,
+        seeds: Iterable[str],
+        max_depth: int = 2,
+        budget: Optional[CrawlBudget] = None,
+        on_page: Optional[Callable[[str, ParsedPage, Optional[str]], Awaitable[None]]] = None
+    ) -> CrawlJob:
+        """Queue a session; `on_page` behaves as in AsyncCrawler.crawl"""
+        job = CrawlJob(session_id, seeds, max_depth, budget, on_page, self.dedup_distance)
+        for seed in job.seeds:
+            job.push(seed, 0, None, 0.0)
+        self.jobs[session_id] = job
+        return job
+
+    def _robots_ready(self, host: str) -> bool:
+        if host in self._robots:
+            return True
+        if not self.respect_robots:
+            self._robots[host] = None
+            self._host_delay[host] = self.min_delay
+            return True
+        # None marks the fetch as started; _load_robots fills it in
+        self._robots[host] = None
+        self._host_next[host] = math.inf
+        self._robot_tasks.append(asyncio.create_task(self._load_robots(host)))
+        return False
+
+    async def _load_robots(self, host: str):
+        rules = RobotFileParser(host + "/robots.txt")
+        try:
+            resp = await self._client.get(host + "/robots.txt")
+            if resp.status_code in (401, 403):
+                rules.disallow_all = True
+            elif resp.status_code >= 400:
+                rules.allow_all = True
+            else:
+                rules.parse(resp.text.splitlines())
+        except Exception as e:
+            print(f"robots.txt error for {host}: {e}")
+            rules.allow_all = True
+        delay = rules.crawl_delay(self.user_agent)
+        async with self._wakeup:
+            self._robots[host] = rules
+            self._host_delay[host] = max(self.min_delay, float(delay or 0))
+            self._host_next[host] = 0.0
+            self._wakeup.notify_all()
+
+    def _take_from(self, job: CrawlJob, now: float) -> Tuple[Optional[Tuple], float]:
+        """Best dispatchable entry of a job and the earliest time a skipped one frees up"""
+        wake = math.inf
+        deadline = job.deadline
+        if deadline is not None:
+            if now >= deadline:
+                job.stop("time")
+                return None, wake
+            wake = deadline
+        if job.budget.max_pages is not None and job.stats.pages + job.in_flight >= job.budget.max_pages:
+            if job.in_flight == 0:
+                job.stop("pages")
+            return None, wake
+
+        deferred, task = [], None
+        while job.frontier and len(deferred) < _SCAN_LIMIT:
+            entry = heapq.heappop(job.frontier)
+            url = entry[4]
+            host = origin(url)
+            if not self._robots_ready(host) or self._host_next.get(host, 0.0) == math.inf:
+                deferred.append(entry)
+                continue
+            rules = self._robots[host]
+            if rules is not None and not rules.can_fetch(self.user_agent, url):
+                job.stats.robots_blocked += 1
+                continue
+            ready = self._host_next.get(host, 0.0)
+            if ready > now or self._host_active.get(host, 0) >= self.per_host_concurrency:
+                if ready > now:
+                    wake = min(wake, ready)
+                deferred.append(entry)
+                continue
+            task = entry
+            break
+        for entry in deferred:
+            heapq.heappush(job.frontier, entry)
+        if task is None:
+            return None, wake
+
+        host = origin(task[4])
+        self._host_active[host] = self._host_active.get(host, 0) + 1
+        self._host_next[host] = now + self._host_delay.get(host, self.min_delay)
+        if not job.stats.started:
+            job.stats.started = now
+        job.in_flight += 1
+        return task, wake
+
+    async def _next(self) -> Optional[Tuple[CrawlJob, Tuple]]:
+        """Next (job, frontier entry) in round-robin order, or None when every job is done"""
+        jobs = list(self.jobs.values())
+        async with self._wakeup:
+            while True:
+                now = time.perf_counter()
+                wake = math.inf
+                for k in range(len(jobs)):
+                    job = jobs[(self._turn + k) % len(jobs)]
+                    if not job.frontier:
+                        continue
+                    task, job_wake = self._take_from(job, now)
+                    if task is not None:
+                        self._turn = (self._turn + k + 1) % len(jobs)
+                        return job, task
+                    wake = min(wake, job_wake)
+                if not any(job.active for job in jobs):
+                    return None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), None if wake == math.inf else max(0.0, wake - now))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _parse(self, pool: Optional[Executor], url: str, html: str) -> ParsedPage:
+        fingerprint = self.dedup_distance is not None
+        if pool is None:
+            return parse_page(url, html, fingerprint)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, parse_page, url, html, fingerprint)
+
+    async def _crawl_one(
+        self,
+        pool: Optional[Executor],
+        job: CrawlJob,
+        depth: int,
+        url: str,
+        fetch_url: str,
+        parent: Optional[str]
+    ):
+        resp = await self._client.get(fetch_url)
+        resp.raise_for_status()
+        job.stats.bytes += len(resp.content)
+        if job.budget.max_bytes is not None and job.stats.bytes >= job.budget.max_bytes:
+            job.stop("bytes")
+
+        page = await self._parse(pool, str(resp.url), resp.text)
+        job.stats.pages += 1
+        if page.fingerprint and job.duplicates.check(page.fingerprint, url) is not None:
+            job.stats.near_duplicates += 1
+            return
+        if job.on_page is not None:
+            await job.on_page(url, page, parent)
+        else:
+            job.link_text_map[url] = page.text
+            if parent is not None:
+                job.relations.append((parent, url))
+        if depth < job.max_depth and job.exhausted is None:
+            for link in page.links:
+                job.push(link, depth + 1, url, self.score(link, url))
+
+    async def _worker(self, pool: Optional[Executor]):
+        while True:
+            item = await self._next()
+            if item is None:
+                return
+            job, (depth, _, _, url, fetch_url, parent) = item
+            try:
+                await self._crawl_one(pool, job, depth, url, fetch_url, parent)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                job.stats.errors += 1  # skip broken
+            finally:
+                job.in_flight -= 1
+                host = origin(fetch_url)
+                self._host_active[host] -= 1
+                async with self._wakeup:
+                    self._wakeup.notify_all()
+
+    async def run(self) -> Dict[str, List]:
+        """
+        Crawl every added session.
+
+        Returns {session_id: [link_text_map, relations]} in the shape of
+        `crawl_relations`; sessions with an `on_page` callback get empty
+        collections. Per-session counters stay on `self.jobs[id].stats`.
+        """
+        self._wakeup = asyncio.Condition()
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency
+        )
+        async with httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout,
+            headers=self.headers,
+            follow_redirects=True
+        ) as client:
+            self._client = client
+            pool = ProcessPoolExecutor(self.parse_workers) if self.parse_workers > 0 else None
+            workers = [asyncio.create_task(self._worker(pool)) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers + self._robot_tasks:
+                    task.cancel()
+                await asyncio.gather(*workers, *self._robot_tasks, return_exceptions=True)
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                self._client = None
+
+        finished = time.perf_counter()
+        for job in self.jobs.values():
+            job.stats.finished = finished if job.stats.started else 0.0
+        return {session_id: job.result() for session_id, job in self.jobs.items()}
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+
+class PageState(NamedTuple):
+    etag: str
+    last_modified: str
+    content_hash: str
+    crawled_at: float
+    links: List[str]
+
+
+class CrawlStateStore:
+    """
+    Persistent per-URL record of what a crawl last saw.
+
+    For every fetched page it keeps the ETag and Last-Modified validators,
+    a hash of the body, the time of the last crawl and the page's outgoing
+    links. Recrawls use the validators for conditional requests and the
+    stored links to keep traversing below pages that did not change. The
+    records live in memory and are written to one JSON file by `flush()`.
+
+    Keep one store per session: a page recorded here is skipped as unchanged,
+    so it would never reach a session that has not indexed it yet. For the
+    same reason the crawler only `stage`s the pages it reports, and their
+    consumer should `commit` each once indexed; staged pages are not
+    persisted, so a page that failed to index is fetched in full again next
+    time.
+    """
+
+    def __init__(self, path: str = "./crawl_state.json"):
+        self.path = path
+        self._pages: Dict[str, PageState] = {}
+        self._staged: Dict[str, PageState] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def content_hash(body: bytes) -> str:
+        """Hash of a response body"""
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                pages = json.load(f)
+            self._pages = {url: PageState(*fields) for url, fields in pages.items()}
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Crawl state reset: {e}")
+            self._pages = {}
+
+    def get(self, url: str) -> Optional[PageState]:
+        return self._pages.get(url)
+
+    def put(self, url: str, etag: str, last_modified: str, content_hash: str, links):
+        """Record a fetched page"""
+        with self._lock:
+            self._pages[url] = PageState(etag, last_modified, content_hash, time.time(), sorted(links))
+            self._dirty = True
+
+    def stage(self, url: str, etag: str, last_modified: str, content_hash: str, links):
+        """Hold a fetched page's record back until `commit(url)` confirms it was indexed"""
+        with self._lock:
+            self._staged[url] = PageState(etag, last_modified, content_hash, time.time(), sorted(links))
+
+    def commit(self, url: str) -> bool:
+        """Record a staged page; False if nothing was staged for it"""
+        with self._lock:
+            state = self._staged.pop(url, None)
+            if state is None:
+                return False
+            self._pages[url] = state
+            self._dirty = True
+            return True
+
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Record that an unchanged page was seen again, refreshing its validators if given"""
+        with self._lock:
+            state = self._pages.get(url)
+            if state is None:
+                return
+            self._pages[url] = state._replace(
+                etag=etag or state.etag,
+                last_modified=last_modified or state.last_modified,
+                crawled_at=time.time()
+            )
+            self._dirty = True
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a page crawled before"""
+        state = self._pages.get(url)
+        headers = {}
+        if state is not None:
+            if state.etag:
+                headers["If-None-Match"] = state.etag
+            if state.last_modified:
+                headers["If-Modified-Since"] = state.last_modified
+        return headers
+
+    def flush(self):
+        """Persist the records to disk"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({url: list(state) for url, state in self._pages.items()}, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._pages
@@ -0,0 +1,42 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "igshid", "ref_src",
+})
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL, so variants of one page are crawled once.
+
+    Lowercases the scheme and host, drops default ports, the fragment,
+    `utm_*` and other tracking parameters, sorts the remaining query
+    parameters and strips a trailing slash from the path ("/" for the root).
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    # `hostname` drops the brackets of an IPv6 literal, so take those from the netloc
+    hostport = parts.netloc.rpartition("@")[2]
+    if hostport.startswith("["):
+        host = hostport[:hostport.find("]") + 1].lower()
+    else:
+        host = (parts.hostname or "").lower()
+    if parts.username is not None:
+        userinfo = parts.username + (f":{parts.password}" if parts.password is not None else "")
+        host = f"{userinfo}@{host}"
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
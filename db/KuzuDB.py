@@ -1,17 +1,36 @@
-import kuzu
-from typing import List, Optional, Dict, Any
+import threading
+import time
+import warnings
+from db.LatencyHistogram import LatencyHistogram
+from db.StoreRegistry import SharedStore, stores
+from typing import List, Optional, Dict, Any, Tuple
 
 class KuzuDB:
     def __init__(self, db_path: str):
-        self.db = kuzu.Database(db_path)
+        import kuzu
+        
+        # one Database per path and process; Kuzu allows a single write
+        # transaction per database, so every writer shares the store's lock
+        self._store = stores.get(
+            "kuzu", db_path,
+            lambda: SharedStore(db=kuzu.Database(db_path), session_versions={}, write_lock=threading.RLock())
+        )
+        self.db = self._store.db
+        self._write_lock = self._store.write_lock
+        # bulk writes open an explicit transaction on their own connection, so
+        # reads on `conn` from other threads never run inside it
         self.conn = kuzu.Connection(self.db)
+        self._write_conn = kuzu.Connection(self.db)
+        self._prepared: Dict[Tuple[int, str], Any] = {}
+        self._session_versions: Dict[str, int] = self._store.session_versions
+        self.latency = LatencyHistogram()
         self._init_schema()
 
     def _init_schema(self):
         """Initialize graph schema if not exists"""
         try:
             self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS links (
+                CREATE NODE TABLE IF NOT EXISTS links (
                     link STRING PRIMARY KEY,
                     session_id STRING,
                     title STRING,
@@ -38,66 +57,180 @@ class KuzuDB:
             print(f"Query error: {e}")
             return []
 
+    def _execute(self, name: str, query: str, parameters: Optional[Dict[str, Any]] = None, conn=None):
+        """Execute a statement prepared once per connection and record its latency"""
+        conn = conn or self.conn
+        key = (id(conn), query)
+        prepared = self._prepared.get(key)
+        if prepared is None:
+            with warnings.catch_warnings():
+                # Kuzu 0.11 deprecates explicit prepare(), but a reused prepared
+                # statement still skips parsing and planning on every call
+                warnings.simplefilter("ignore", DeprecationWarning)
+                prepared = conn.prepare(query)
+            self._prepared[key] = prepared
+        start = time.perf_counter()
+        try:
+            return conn.execute(prepared, parameters or {})
+        finally:
+            self.latency.record(name, time.perf_counter() - start)
+
+    def latency_report(self) -> Dict[str, Dict[str, float]]:
+        """Per-query latency summary in milliseconds"""
+        return self.latency.summary()
+
+    def session_version(self, session_id: str) -> int:
+        """Counter bumped whenever edges are written to a session through any KuzuDB on this database"""
+        return self._session_versions.get(session_id, 0)
+
+    def _touch_session(self, session_id: str):
+        self._session_versions[session_id] = self._session_versions.get(session_id, 0) + 1
+
     def insert_rel(self, link1: str, link2: str, session_id: str):
-        """Insert relationship between two links"""
+        """Insert relationship between two links, unless it already exists"""
         try:
-            link1_safe = self._escape(link1)
-            link2_safe = self._escape(link2)
-            session_safe = self._escape(session_id)
-            
-            query = f"""
-                MATCH (l1:links {{link:'{link1_safe}', session_id:'{session_safe}'}}),
-                      (l2:links {{link:'{link2_safe}', session_id:'{session_safe}'}})
-                CREATE (l1)-[:hyprlink {{session_id:'{session_safe}'}}]->(l2)
-            """
-            self.conn.execute(query)
+            with self._write_lock:
+                self._execute("insert_rel", """
+                    MATCH (l1:links {link: $link1, session_id: $session_id}),
+                          (l2:links {link: $link2, session_id: $session_id})
+                    MERGE (l1)-[:hyprlink {session_id: $session_id}]->(l2)
+                """, {"link1": link1, "link2": link2, "session_id": session_id})
+                self._touch_session(session_id)
         except Exception as e:
             print(f"Insert relationship error: {e}")
 
     def insert_node(self, link: str, session_id: str):
-        """Insert node into graph"""
+        """Insert node into graph, unless it already exists"""
         try:
-            link_safe = self._escape(link)
-            session_safe = self._escape(session_id)
-            
-            query = f"""
-                CREATE (n:links {{
-                    link:'{link_safe}',
-                    session_id:'{session_safe}',
-                    title:'',
-                    summary:'',
-                    embedding_id:''
-                }})
-            """
-            self.conn.execute(query)
+            with self._write_lock:
+                self._execute("insert_node", """
+                    MERGE (n:links {link: $link})
+                    ON CREATE SET n.session_id = $session_id,
+                                  n.title = '',
+                                  n.summary = '',
+                                  n.embedding_id = ''
+                """, {"link": link, "session_id": session_id})
         except Exception as e:
             print(f"Insert node error: {e}")
 
+    def insert_nodes(self, links: List[str], session_id: str, batch_size: int = 5000) -> int:
+        """Insert many nodes in one transaction, skipping links that already exist"""
+        rows = [{"link": link} for link in dict.fromkeys(links)]
+        query = """
+            UNWIND $rows AS row
+            MERGE (n:links {link: row.link})
+            ON CREATE SET n.session_id = $session_id,
+                          n.title = '',
+                          n.summary = '',
+                          n.embedding_id = ''
+        """
+        return self._bulk_execute("insert_nodes", query, rows, {"session_id": session_id}, batch_size)
+
+    def insert_rels(self, pairs: List[Tuple[str, str]], session_id: str, batch_size: int = 5000) -> int:
+        """Insert many relationships in one transaction, skipping ones that already exist"""
+        rows = [{"src": src, "dst": dst} for src, dst in dict.fromkeys(pairs)]
+        query = """
+            UNWIND $rows AS row
+            MATCH (l1:links {link: row.src, session_id: $session_id}),
+                  (l2:links {link: row.dst, session_id: $session_id})
+            MERGE (l1)-[:hyprlink {session_id: $session_id}]->(l2)
+        """
+        with self._write_lock:
+            inserted = self._bulk_execute("insert_rels", query, rows, {"session_id": session_id}, batch_size)
+            if inserted:
+                self._touch_session(session_id)
+        return inserted
+
+    def _bulk_execute(
+        self,
+        name: str,
+        query: str,
+        rows: List[Dict[str, Any]],
+        parameters: Dict[str, Any],
+        batch_size: int
+    ) -> int:
+        """Run an UNWIND query over rows in batches inside a single transaction"""
+        if not rows:
+            return 0
+        with self._write_lock:
+            conn = self._write_conn
+            try:
+                conn.execute("BEGIN TRANSACTION")
+                for start in range(0, len(rows), batch_size):
+                    self._execute(name, query, {**parameters, "rows": rows[start:start + batch_size]}, conn)
+                conn.execute("COMMIT")
+                return len(rows)
+            except Exception as e:
+                print(f"Bulk {name} error: {e}")
+                try:
+                    conn.execute("ROLLBACK")
+                except Exception:
+                    pass
+                return 0
+
     def get_neighbors(self, link: str, session_id: str, depth: int = 1) -> List[str]:
         """Get connected nodes within specified depth"""
         try:
-            link_safe = self._escape(link)
-            session_safe = self._escape(session_id)
-            
-            query = f"""
-                MATCH (start:links {{link:'{link_safe}', session_id:'{session_safe}'}})
-                       -[:hyprlink*1..{depth}]->
-                       (neighbor:links {{session_id:'{session_safe}'}})
+            # the hop bound cannot be a parameter, so each depth gets its own statement
+            result = self._execute(f"get_neighbors_{int(depth)}", f"""
+                MATCH (start:links {{link: $link, session_id: $session_id}})
+                       -[:hyprlink*1..{int(depth)}]->
+                       (neighbor:links {{session_id: $session_id}})
                 RETURN neighbor.link
-            """
-            results = self.show(query)
-            return [r[0] if isinstance(r, (list, tuple)) else r.get('neighbor.link', '') for r in results]
+            """, {"link": link, "session_id": session_id})
+            return [r[0] for r in result]
         except Exception as e:
             print(f"Get neighbors error: {e}")
             return []
 
+    def get_neighborhoods(
+        self,
+        links: List[str],
+        session_id: str,
+        depth: int = 1
+    ) -> Dict[str, Dict[str, int]]:
+        """Map each start link to its neighbors within depth hops and their shortest hop count, in one query"""
+        neighborhoods: Dict[str, Dict[str, int]] = {link: {} for link in links}
+        if not links:
+            return neighborhoods
+        try:
+            result = self._execute(f"get_neighborhoods_{int(depth)}", f"""
+                MATCH (start:links)-[p:hyprlink* SHORTEST 1..{int(depth)}]->(neighbor:links)
+                WHERE start.link IN $links
+                  AND start.session_id = $session_id
+                  AND neighbor.session_id = $session_id
+                  AND neighbor.link <> start.link
+                RETURN start.link, neighbor.link, length(p)
+            """, {"links": list(dict.fromkeys(links)), "session_id": session_id})
+            for start, neighbor, hops in result:
+                known = neighborhoods[start].get(neighbor)
+                if known is None or hops < known:
+                    neighborhoods[start][neighbor] = hops
+        except Exception as e:
+            print(f"Get neighborhoods error: {e}")
+        return neighborhoods
+
+    def get_session_edges(self, session_id: str) -> List[Tuple[str, str]]:
+        """Get all (from, to) hyprlink edges in a session"""
+        try:
+            result = self._execute("get_session_edges", """
+                MATCH (l1:links {session_id: $session_id})-[:hyprlink]->(l2:links {session_id: $session_id})
+                RETURN l1.link, l2.link
+            """, {"session_id": session_id})
+            return [(r[0], r[1]) for r in result]
+        except Exception as e:
+            print(f"Get session edges error: {e}")
+            return []
+
     def get_session_nodes(self, session_id: str) -> List[str]:
         """Get all nodes in a session"""
         try:
-            session_safe = self._escape(session_id)
-            query = f"MATCH (n:links {{session_id:'{session_safe}'}}) RETURN n.link"
-            results = self.show(query)
-            return [r[0] if isinstance(r, (list, tuple)) else r.get('n.link', '') for r in results]
+            result = self._execute(
+                "get_session_nodes",
+                "MATCH (n:links {session_id: $session_id}) RETURN n.link",
+                {"session_id": session_id}
+            )
+            return [r[0] for r in result]
         except Exception as e:
             print(f"Get session nodes error: {e}")
             return []
@@ -110,15 +243,10 @@ class KuzuDB:
         except Exception as e:
             print(f"Test failed: {e}")
 
-    def _escape(self, text: str) -> str:
-        """Escape single quotes in strings"""
-        if not isinstance(text, str):
-            text = str(text)
-        return text.replace("'", "\\'")
-
     def __del__(self):
         """Close connection"""
         try:
             self.conn.close()
+            self._write_conn.close()
         except:
             pass
\ No newline at end of file
@@ -0,0 +1,61 @@
+import math
+import threading
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    """
+    Per-query latency histogram with power-of-two microsecond buckets.
+
+    Bucket i counts calls that took less than 2**i microseconds (and at least
+    2**(i-1)), so percentiles are accurate to within a factor of two, which is
+    plenty to see planning savings or regressions.
+    """
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self._counts: Dict[str, List[int]] = {}
+        self._totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        """Record one call of query `name`"""
+        micros = max(seconds * 1e6, 1.0)
+        bucket = min(self.BUCKETS - 1, math.ceil(math.log2(micros)))
+        with self._lock:
+            counts = self._counts.get(name)
+            if counts is None:
+                counts = self._counts[name] = [0] * self.BUCKETS
+                self._totals[name] = 0.0
+            counts[bucket] += 1
+            self._totals[name] += seconds
+
+    def _percentile(self, counts: List[int], total: int, q: float) -> float:
+        rank = q * total
+        seen = 0
+        for bucket, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return 2 ** bucket / 1000.0
+        return 2 ** (self.BUCKETS - 1) / 1000.0
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Call count, mean and bucketed p50/p95/p99 in milliseconds per query"""
+        report = {}
+        with self._lock:
+            for name, counts in self._counts.items():
+                total = sum(counts)
+                report[name] = {
+                    "count": total,
+                    "mean_ms": self._totals[name] / total * 1000.0,
+                    "p50_ms": self._percentile(counts, total, 0.50),
+                    "p95_ms": self._percentile(counts, total, 0.95),
+                    "p99_ms": self._percentile(counts, total, 0.99),
+                }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._totals.clear()
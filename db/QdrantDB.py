@@ -1,69 +1,362 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+import hashlib
 import numpy as np
-from typing import List, Optional, Dict, Any
+import re
+import threading
+import uuid
+import warnings
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Tuple
+from db.StoreRegistry import SharedStore, stores
+
+if TYPE_CHECKING:
+    from qdrant_client.http.models import Filter
 
 class QdrantDB:
+    """
+    Qdrant vector store for document chunks.
+
+    Payloads are indexed on `session_id` (as the tenant key), `url` and
+    `doc_id`. With `partition_by_session=True` every session gets its own
+    collection named `<collection>__<session>`, so a session's searches
+    never scan other sessions' points even on embedded (local) Qdrant,
+    which ignores payload indexes.
+
+    Point ids are UUIDv5 values derived from the caller's string ids, so
+    re-upserting the same id in any process overwrites the existing point.
+    """
+
+    ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/iamsurjog/Arabella")
+
     def __init__(
         self,
         path: str = "./vector_db",
         collection_name: str = "nodes",
-        vector_size: int = 768
+        vector_size: int = 768,
+        partition_by_session: bool = False,
+        upload_batch_size: int = 256,
+        upload_workers: int = 1
     ):
-        self.client = QdrantClient(path=path)
+        # qdrant_client takes about a second to import, so it is only loaded
+        # once a store is actually opened
+        from qdrant_client import QdrantClient
+        
+        # one client per storage folder and process, shared with the lock that
+        # serializes it (embedded Qdrant is not safe to use from several threads)
+        self._store = stores.get(
+            "qdrant", path, lambda: SharedStore(client=QdrantClient(path=path), lock=threading.RLock())
+        )
+        self.client, self._lock = self._store.client, self._store.lock
         self.collection = collection_name
         self.vector_size = vector_size
+        self.partition_by_session = partition_by_session
+        self.upload_batch_size = upload_batch_size
+        self.upload_workers = max(1, upload_workers)
+        self._known_collections = set()
         
-        if not self.client.collection_exists(self.collection):
+        self._ensure_collection(self.collection)
+
+    def _ensure_collection(self, name: str):
+        """Create a collection if it does not exist and make sure it has its payload indexes"""
+        from qdrant_client.http.models import Distance, VectorParams
+        
+        if name in self._known_collections:
+            return
+        if not self.client.collection_exists(name):
             self.client.create_collection(
-                collection_name=self.collection,
+                collection_name=name,
                 vectors_config=VectorParams(
-                    size=vector_size,
+                    size=self.vector_size,
                     distance=Distance.COSINE
                 ),
             )
+        # collections created by older versions lack some indexes, so check every one once
+        self._create_payload_indexes(name)
+        self._known_collections.add(name)
+
+    def _create_payload_indexes(self, name: str):
+        """
+        Index the payload fields searches filter on, skipping ones already
+        indexed; creating an existing index again is harmless, so this also
+        works where the schema is not reported (embedded Qdrant)
+        """
+        from qdrant_client.http.models import KeywordIndexParams, PayloadSchemaType
+        
+        indexes = {
+            "session_id": KeywordIndexParams(type="keyword", is_tenant=True),
+            "url": PayloadSchemaType.KEYWORD,
+            "doc_id": PayloadSchemaType.KEYWORD,
+            "chunk_idx": PayloadSchemaType.INTEGER,
+        }
+        existing = self.client.get_collection(name).payload_schema or {}
+        with warnings.catch_warnings():
+            # embedded Qdrant warns that payload indexes have no effect there
+            warnings.simplefilter("ignore", UserWarning)
+            for field, schema in indexes.items():
+                if field not in existing:
+                    self.client.create_payload_index(collection_name=name, field_name=field, field_schema=schema)
+
+    def session_collection(self, session_id: str) -> str:
+        """Name of the collection holding a session's points"""
+        if not self.partition_by_session:
+            return self.collection
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+        if safe != session_id:
+            safe += "_" + hashlib.blake2b(session_id.encode("utf-8"), digest_size=4).hexdigest()
+        return f"{self.collection}__{safe}"
+
+    def _session_filter(self, session_id: Optional[str], query_filter: Optional["Filter"]) -> Optional["Filter"]:
+        """Combine a session restriction with a caller-supplied filter"""
+        from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+        
+        must = []
+        if session_id is not None and not self.partition_by_session:
+            must.append(FieldCondition(key="session_id", match=MatchValue(value=session_id)))
+        if query_filter is not None:
+            if not must:
+                return query_filter
+            must.append(query_filter)
+        return Filter(must=must) if must else None
+
+    @classmethod
+    def point_id(cls, id_val: str) -> str:
+        """Stable 128-bit point id for a string id"""
+        return str(uuid.uuid5(cls.ID_NAMESPACE, id_val))
+
+    def unchanged_ids(
+        self,
+        ids: List[str],
+        content_hashes: List[str],
+        session_id: Optional[str] = None
+    ) -> set:
+        """Ids whose stored point already carries the given `content_hash` payload"""
+        if not ids:
+            return set()
+        name = self.session_collection(session_id) if session_id is not None else self.collection
+        expected = {self.point_id(id_val): (id_val, h) for id_val, h in zip(ids, content_hashes)}
+        with self._lock:
+            if name not in self._known_collections and not self.client.collection_exists(name):
+                return set()
+            records = self.client.retrieve(
+                collection_name=name,
+                ids=list(expected),
+                with_payload=["content_hash"],
+                with_vectors=False
+            )
+        unchanged = set()
+        for record in records:
+            id_val, content_hash = expected[str(record.id)]
+            if (record.payload or {}).get("content_hash") == content_hash:
+                unchanged.add(id_val)
+        return unchanged
 
     def upsert_points(
         self,
         ids: List[str],
-        vectors: List[List[float]],
+        vectors,
         payloads: Optional[List[Dict[str, Any]]] = None
     ):
-        """Upsert points into collection"""
+        """
+        Upsert points into collection
+        
+        `vectors` is a float32 (n, dim) matrix (lists of floats are converted
+        once). Points go up in columnar batches of `upload_batch_size` using
+        `upload_workers` parallel workers against a Qdrant server.
+        """
         if payloads is None:
             payloads = [{}] * len(ids)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        point_ids = [self.point_id(id_val) for id_val in ids]
         
-        points = []
-        for i, (id_val, v, p) in enumerate(zip(ids, vectors, payloads)):
-            point_id = abs(hash(id_val)) % (2**31)
-            point = PointStruct(
-                id=point_id,
-                vector=np.array(v).astype(np.float32).tolist(),
-                payload=p
-            )
-            points.append(point)
+        groups: Dict[str, List[int]] = {}
+        for row, p in enumerate(payloads):
+            name = self.collection
+            if self.partition_by_session and p.get("session_id") is not None:
+                name = self.session_collection(p["session_id"])
+            groups.setdefault(name, []).append(row)
         
-        self.client.upsert(collection_name=self.collection, points=points)
+        with self._lock:
+            for name, rows in groups.items():
+                self._ensure_collection(name)
+                if len(rows) == len(point_ids):
+                    group_ids, group_vectors, group_payloads = point_ids, matrix, payloads
+                else:
+                    group_ids = [point_ids[r] for r in rows]
+                    group_vectors = matrix[rows]
+                    group_payloads = [payloads[r] for r in rows]
+                self.client.upload_collection(
+                    collection_name=name,
+                    vectors=group_vectors,
+                    payload=group_payloads,
+                    ids=group_ids,
+                    batch_size=self.upload_batch_size,
+                    parallel=self.upload_workers,
+                    wait=True
+                )
 
     def query(
         self,
-        vector: List[float],
+        vector,
         limit: int = 5,
-        score_threshold: float = 0.0
+        score_threshold: float = 0.0,
+        session_id: Optional[str] = None,
+        query_filter: Optional["Filter"] = None
     ) -> List[Any]:
-        """Query collection and return results"""
-        results = self.client.search(
-            collection_name=self.collection,
-            query_vector=np.array(vector).astype(np.float32).tolist(),
-            limit=limit,
-            score_threshold=score_threshold
-        )
-        return results
+        """Query collection and return results, restricted to a session if given"""
+        name = self.collection
+        with self._lock:
+            if self.partition_by_session and session_id is not None:
+                name = self.session_collection(session_id)
+                if name not in self._known_collections and not self.client.collection_exists(name):
+                    return []
+            response = self.client.query_points(
+                collection_name=name,
+                query=np.asarray(vector, dtype=np.float32).tolist(),
+                query_filter=self._session_filter(session_id, query_filter),
+                limit=limit,
+                score_threshold=score_threshold,
+                with_payload=True
+            )
+        return response.points
+
+    def query_batch(
+        self,
+        vectors,
+        limit: int = 5,
+        score_threshold: float = 0.0,
+        session_id: Optional[str] = None,
+        query_filter: Optional["Filter"] = None
+    ) -> List[List[Any]]:
+        """Run several searches in one request, one result list per vector"""
+        from qdrant_client.http.models import QueryRequest
+        
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if len(matrix) == 0:
+            return []
+        name = self.collection
+        if self.partition_by_session and session_id is not None:
+            name = self.session_collection(session_id)
+        search_filter = self._session_filter(session_id, query_filter)
+        requests = [
+            QueryRequest(
+                query=vector,
+                filter=search_filter,
+                limit=limit,
+                score_threshold=score_threshold,
+                with_payload=True
+            )
+            for vector in matrix.tolist()
+        ]
+        with self._lock:
+            if name not in self._known_collections and not self.client.collection_exists(name):
+                return [[] for _ in requests]
+            responses = self.client.query_batch_points(collection_name=name, requests=requests)
+        return [response.points for response in responses]
+
+    def get_payloads(self, ids: List[str], session_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Payloads of the points with the given string ids, in one request; missing ids are left out"""
+        if not ids:
+            return {}
+        name = self.session_collection(session_id) if session_id is not None else self.collection
+        by_point = {self.point_id(id_val): id_val for id_val in ids}
+        with self._lock:
+            if name not in self._known_collections and not self.client.collection_exists(name):
+                return {}
+            records = self.client.retrieve(
+                collection_name=name,
+                ids=list(by_point),
+                with_payload=True,
+                with_vectors=False
+            )
+        return {by_point[str(record.id)]: record.payload or {} for record in records}
+
+    def leading_chunks(
+        self,
+        urls: List[str],
+        session_id: Optional[str] = None,
+        per_url: int = 1
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Payloads of the first `per_url` chunks of each URL, fetched in one
+        filtered scroll and returned per URL in chunk order
+        """
+        from qdrant_client.http.models import FieldCondition, Filter, MatchAny, Range
+        
+        found: Dict[str, List[Dict[str, Any]]] = {url: [] for url in urls}
+        if not urls or per_url <= 0:
+            return found
+        name = self.session_collection(session_id) if session_id is not None else self.collection
+        scroll_filter = self._session_filter(session_id, Filter(must=[
+            FieldCondition(key="url", match=MatchAny(any=list(urls))),
+            FieldCondition(key="chunk_idx", range=Range(lt=per_url)),
+        ]))
+        with self._lock:
+            if name not in self._known_collections and not self.client.collection_exists(name):
+                return found
+            records, _ = self.client.scroll(
+                collection_name=name,
+                scroll_filter=scroll_filter,
+                limit=len(urls) * per_url,
+                with_payload=True,
+                with_vectors=False
+            )
+        for record in records:
+            payload = record.payload or {}
+            if payload.get("url") in found:
+                found[payload["url"]].append(payload)
+        for chunks in found.values():
+            chunks.sort(key=lambda p: p.get("chunk_idx", 0))
+        return found
+
+    def trim_chunks(
+        self,
+        chunk_counts: Dict[str, int],
+        session_id: Optional[str] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Delete the chunks of each URL numbered at or past its current chunk
+        count, left over from a longer earlier version of the page; returns
+        the (url, chunk_idx) pairs removed
+        """
+        from qdrant_client.http.models import FieldCondition, Filter, MatchAny, PointIdsList, Range
+        
+        if not chunk_counts:
+            return []
+        name = self.session_collection(session_id) if session_id is not None else self.collection
+        scroll_filter = self._session_filter(session_id, Filter(must=[
+            FieldCondition(key="url", match=MatchAny(any=list(chunk_counts))),
+            FieldCondition(key="chunk_idx", range=Range(gte=min(chunk_counts.values()))),
+        ]))
+        stale_ids, removed = [], []
+        with self._lock:
+            if name not in self._known_collections and not self.client.collection_exists(name):
+                return []
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=name,
+                    scroll_filter=scroll_filter,
+                    limit=256,
+                    offset=offset,
+                    with_payload=["url", "chunk_idx"],
+                    with_vectors=False
+                )
+                for record in records:
+                    payload = record.payload or {}
+                    url, chunk_idx = payload.get("url"), payload.get("chunk_idx", 0)
+                    if chunk_idx >= chunk_counts.get(url, chunk_idx + 1):
+                        stale_ids.append(record.id)
+                        removed.append((url, chunk_idx))
+                if offset is None:
+                    break
+            if stale_ids:
+                self.client.delete(collection_name=name, points_selector=PointIdsList(points=stale_ids), wait=True)
+        return removed
 
     def delete_collection(self):
-        """Delete entire collection"""
-        if self.client.collection_exists(self.collection):
-            self.client.delete_collection(collection_name=self.collection)
+        """Delete entire collection, including per-session partitions"""
+        for existing in self.client.get_collections().collections:
+            if existing.name == self.collection or existing.name.startswith(f"{self.collection}__"):
+                self.client.delete_collection(collection_name=existing.name)
+        self._known_collections.clear()
 
     def get_collection_info(self) -> Dict[str, Any]:
         """Get collection metadata"""
@@ -75,10 +368,4 @@ class QdrantDB:
     def clear_collection(self):
         """Clear all points from collection"""
         self.delete_collection()
-        self.client.create_collection(
-            collection_name=self.collection,
-            vectors_config=VectorParams(
-                size=self.vector_size,
-                distance=Distance.COSINE
-            ),
-        )
+        self._ensure_collection(self.collection)
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class SessionGraph:
+    """
+    Read-only CSR adjacency of one session's hyprlink edges.
+
+    Links are mapped to integer ids; the out-neighbors of node i are
+    targets[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, edges: List[Tuple[str, str]]):
+        ids: Dict[str, int] = {}
+        pairs = [(ids.setdefault(a, len(ids)), ids.setdefault(b, len(ids))) for a, b in edges]
+        src, dst = np.array(pairs, dtype=np.int32).reshape(-1, 2).T
+
+        order = np.argsort(src, kind="stable")
+        self.targets = dst[order]
+        self.offsets = np.zeros(len(ids) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=len(ids)), out=self.offsets[1:])
+        self.ids = ids
+        self.links = list(ids)
+        # arrays plus a rough per-link cost for the id map and link strings
+        link_bytes = sum(len(link) for link in self.links) + 100 * len(self.links)
+        self.nbytes = self.targets.nbytes + self.offsets.nbytes + link_bytes
+
+    def neighborhoods(self, links: List[str], depth: int = 1) -> Dict[str, Dict[str, int]]:
+        """Same result as KuzuDB.get_neighborhoods, served from memory"""
+        result: Dict[str, Dict[str, int]] = {}
+        for link in links:
+            found: Dict[str, int] = {}
+            result[link] = found
+            start = self.ids.get(link)
+            if start is None:
+                continue
+            seen = {start}
+            frontier = [start]
+            for hop in range(1, depth + 1):
+                nxt = []
+                for node in frontier:
+                    for target in self.targets[self.offsets[node]:self.offsets[node + 1]].tolist():
+                        if target not in seen:
+                            seen.add(target)
+                            nxt.append(target)
+                            found[self.links[target]] = hop
+                if not nxt:
+                    break
+                frontier = nxt
+        return result
+
+
+class SessionGraphCache:
+    """
+    LRU cache of SessionGraph adjacency per session, bounded by `max_bytes`.
+
+    A session's graph is loaded from Kuzu the first time it is used. Entries
+    remember the session's edge-write version in KuzuDB and are rebuilt once
+    new edges have been written to that session.
+    """
+
+    def __init__(self, graph_db, max_bytes: int = 64 * 1024 * 1024):
+        self.graph_db = graph_db
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._graphs: "OrderedDict[str, Tuple[int, SessionGraph]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionGraph:
+        """Return the adjacency of a session, loading it if missing or stale"""
+        version = self.graph_db.session_version(session_id)
+        with self._lock:
+            entry = self._graphs.get(session_id)
+            if entry is not None and entry[0] == version:
+                self._graphs.move_to_end(session_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        graph = SessionGraph(self.graph_db.get_session_edges(session_id))
+        with self._lock:
+            self._discard(session_id)
+            if graph.nbytes <= self.max_bytes:
+                self._graphs[session_id] = (version, graph)
+                self._bytes += graph.nbytes
+                while self._bytes > self.max_bytes:
+                    self._discard(next(iter(self._graphs)))
+        return graph
+
+    def get_neighborhoods(self, links: List[str], session_id: str, depth: int = 1) -> Dict[str, Dict[str, int]]:
+        """Neighborhood expansion for a session, served from its cached adjacency"""
+        return self.get(session_id).neighborhoods(links, depth)
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._discard(session_id)
+
+    def _discard(self, session_id: str):
+        entry = self._graphs.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry[1].nbytes
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._graphs),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,52 @@
+import os
+import threading
+import weakref
+from typing import Callable, Tuple
+
+
+class SharedStore:
+    """The handles of one opened store, e.g. a database object and the lock guarding it"""
+
+    def __init__(self, **handles):
+        self.__dict__.update(handles)
+
+
+class StoreRegistry:
+    """
+    Process-wide handles of embedded stores, one per (kind, path).
+
+    Embedded Kuzu and Qdrant lock their directory, so opening the same
+    store twice in one process fails or, worse, lets two handles write to
+    it independently. Store wrappers ask the registry instead of opening
+    the files themselves; the first caller's `factory` opens the store and
+    every later caller for the same path shares the result.
+
+    The registry only holds weak references: wrappers keep the SharedStore
+    they were given, and a store is closed once the last wrapper using it
+    is gone, so short-lived stores (tests, benchmarks) do not pile up.
+    """
+
+    def __init__(self):
+        self._handles: "weakref.WeakValueDictionary[Tuple[str, str], SharedStore]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(kind: str, path: str) -> Tuple[str, str]:
+        return kind, os.path.realpath(path)
+
+    def get(self, kind: str, path: str, factory: Callable[[], SharedStore]) -> SharedStore:
+        """The shared handles of `kind` for `path`, opened with `factory` if no one holds them"""
+        key = self._key(kind, path)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = self._handles[key] = factory()
+            return handle
+
+    def forget(self, kind: str, path: str):
+        """Drop a handle so the next `get` opens the store again"""
+        with self._lock:
+            self._handles.pop(self._key(kind, path), None)
+
+
+stores = StoreRegistry()
@@ -1,21 +1,176 @@
-from types import new_class
-from fastapi import FastAPI
-from fastapi.routing import request_response
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-app = FastAPI()
+from rag import GraphRAG
+from rag.answer_cache import CachedAnswer
+from scripts.config import config
+
 
 class Graph(BaseModel):
     session_id: str
+    url: str | None = None
+    max_depth: int = 2
 
 class Query(BaseModel):
     session_id: str
     query: str
     new_session: bool | None = True
+    stream: bool = False
+
+
+def build_rag(settings: dict) -> GraphRAG:
+    """The GraphRAG instance shared by every request"""
+    return GraphRAG(
+        embedding_model=settings["embeddings-model"],
+        language_model=settings["language-model"]
+    )
+
+
+def report_warmup(future: asyncio.Future):
+    """Log a failed warmup; the stores open again on first use"""
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Warmup error: {future.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the databases once and size the worker pools.
+
+    GraphRAG's Qdrant, Kuzu and Ollama calls block, so handlers run them on
+    a bounded thread pool, installed as the loop's default executor so the
+    streaming indexer's stages share it. LLM generation additionally waits
+    for one of `llm-concurrency` slots, so a burst of queries cannot queue
+    more completions on the local model than it can serve, and retrieval
+    for other sessions keeps flowing meanwhile.
+
+    Opening the stores and loading the Ollama client happens on the pool
+    after startup, so the server accepts connections right away; requests
+    arriving earlier simply wait for the stores they touch. A failed warmup
+    is logged and the stores are opened again by the first request that
+    needs them.
+    """
+    settings = config()
+    executor = ThreadPoolExecutor(
+        max_workers=settings.get("api-workers", 8),
+        thread_name_prefix="graphrag"
+    )
+    asyncio.get_running_loop().set_default_executor(executor)
+    app.state.rag = build_rag(settings)
+    app.state.llm_slots = asyncio.Semaphore(settings.get("llm-concurrency", 2))
+    app.state.warmup = asyncio.get_running_loop().run_in_executor(None, app.state.rag.open)
+    app.state.warmup.add_done_callback(report_warmup)
+    try:
+        yield
+    finally:
+        executor.shutdown(wait=True)
+        app.state.rag.flush()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def run_blocking(func, *args):
+    """Run a blocking GraphRAG call on the shared thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+_END = object()
+
+
+async def stream_blocking(func, *args):
+    """
+    Iterate a blocking generator on the shared thread pool.
+
+    Items are handed to the event loop as they are produced. When the
+    consumer stops early (e.g. the client disconnected) the producer is
+    told to stop after its current item, which closes the generator.
+    """
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def pump():
+        try:
+            for item in func(*args):
+                loop.call_soon_threadsafe(items.put_nowait, item)
+                if stop.is_set():
+                    break
+        finally:
+            loop.call_soon_threadsafe(items.put_nowait, _END)
+
+    producer = loop.run_in_executor(None, pump)
+    try:
+        while (item := await items.get()) is not _END:
+            yield item
+    finally:
+        stop.set()
+        await producer
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def answer_events(request: Request, query: Query, docs, vector):
+    """Server-sent events: the source URLs first, then one event per token, then done"""
+    rag: GraphRAG = request.app.state.rag
+    yield sse("sources", [doc["url"] for doc in docs])
+    if not docs:
+        yield sse("token", "No relevant documents found in knowledge graph.")
+    else:
+        context = await run_blocking(rag.aggregate_context, docs, query.session_id)
+        tokens = []
+        async with request.app.state.llm_slots:
+            async for token in stream_blocking(rag.generate_stream, query.query, context):
+                tokens.append(token)
+                yield sse("token", token)
+        await run_blocking(rag.remember_answer, query.query, query.session_id, docs, "".join(tokens), vector)
+    yield sse("done", {})
+
+
+async def cached_events(hit):
+    yield sse("sources", hit.sources)
+    yield sse("token", hit.answer)
+    yield sse("done", {"cached": True})
+
 
 @app.post("/query")
-async def query(query:Query):
-    return f"{query.session_id  = }, {query.query  = }, {query.new_session  = }"
+async def query(query: Query, request: Request):
+    """
+    Answer a query, either as one JSON body or, with `stream`, as
+    server-sent events that deliver the sources before the first token
+    """
+    rag: GraphRAG = request.app.state.rag
+    # one embedding of the query serves the cache lookup, retrieval and the cache write
+    vector, docs = await run_blocking(rag.retrieve_for_answer, query.query, query.session_id)
+    if isinstance(docs, CachedAnswer):
+        if query.stream:
+            return StreamingResponse(cached_events(docs), media_type="text/event-stream")
+        return {"session_id": query.session_id, "answer": docs.answer, "sources": docs.sources, "cached": True}
+
+    if query.stream:
+        return StreamingResponse(
+            answer_events(request, query, docs, vector),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
+        )
+    sources = [doc["url"] for doc in docs]
+    if not docs:
+        answer = "No relevant documents found in knowledge graph."
+    else:
+        context = await run_blocking(rag.aggregate_context, docs, query.session_id)
+        async with request.app.state.llm_slots:
+            answer = await run_blocking(rag.generate_response, query.query, context)
+        await run_blocking(rag.remember_answer, query.query, query.session_id, docs, answer, vector)
+    return {"session_id": query.session_id, "answer": answer, "sources": sources, "cached": False}
 
 ## TODO: Do we even need this?
 @app.get("/answer")
@@ -23,5 +178,20 @@ async def answer():
     pass
 
 @app.post("/graph")
-async def graph(graph:Graph):
-    return f"{graph.session_id = }"
+async def graph(graph: Graph, request: Request):
+    rag: GraphRAG = request.app.state.rag
+    stats = None
+    if graph.url:
+        from rag.pipeline import StreamingIndexer
+
+        indexer = StreamingIndexer(rag, graph.session_id)
+        stats = (await indexer.run(graph.url, max_depth=graph.max_depth)).as_dict()
+        await run_blocking(rag.flush)
+    nodes = await run_blocking(rag.graph_db.get_session_nodes, graph.session_id)
+    edges = await run_blocking(rag.graph_db.get_session_edges, graph.session_id)
+    return {
+        "session_id": graph.session_id,
+        "nodes": len(nodes),
+        "edges": len(edges),
+        "indexed": stats,
+    }
@@ -1,24 +1,29 @@
 import re
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from typing import List
+
+from query_bridge.stopwords import STOPWORDS
+
+# lowercase letters and digits only: the same tokens the old
+# "replace everything else by spaces, then word_tokenize" produced
+_TOKEN = re.compile(r"[a-z0-9]+")
 
 class QueryBridge:
+    """Turns a natural-language question into a short keyword query"""
+
+    max_keywords = 7
+
     def __init__(self):
-        import nltk
-        nltk.download('stopwords', quiet=True)
-        nltk.download('punkt', quiet=True)
+        self.stopwords = STOPWORDS
 
-        self.stopwords = set(stopwords.words('english'))
-        self.stopwords.update([
-            'how', 'what', 'why', 'when', 'where', 'which',
-            'who', 'is', 'are', 'am', 'be', 'do', 'does', 'can', 'will',
-            'the', 'a', 'an', 'in', 'on', 'of', 'for', 'to', 'and', 'or'
-        ])
+    def keywords(self, query: str) -> List[str]:
+        stopwords = self.stopwords
+        return [token for token in _TOKEN.findall(query.lower()) if token not in stopwords]
 
     def transform(self, query: str) -> str:
-        q = query.lower()
-        q = re.sub(r"[^a-z0-9\s]", " ", q)
-        tokens = word_tokenize(q)
-        keywords = [token for token in tokens if token not in self.stopwords]
-        result = " ".join(keywords[:7])
+        result = " ".join(self.keywords(query)[:self.max_keywords])
         return result if result.strip() else query
+
+    def transform_many(self, queries: List[str]) -> List[str]:
+        """transform() for a batch of queries"""
+        transform = self.transform
+        return [transform(query) for query in queries]
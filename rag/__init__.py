@@ -1,15 +1,23 @@
-import ollama
+import asyncio
+import hashlib
+import heapq
+import threading
+import numpy as np
 from db.QdrantDB import QdrantDB
 from db.KuzuDB import KuzuDB
-from typing import List, Dict, Any, Optional
+from db.SessionGraphCache import SessionGraphCache
+from rag.answer_cache import CachedAnswer, SemanticAnswerCache
+from rag.chunking import fallback_chunks, get_chunker
+from rag.context import build_context
+from rag.embedding_cache import EmbeddingCache
+from rag.lazy import lazy_import
+from rag.lexical_index import LexicalIndex
+from query_bridge import QueryBridge
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import re
 
-try:
-    import semchunk
-    HAS_SEMCHUNK = True
-except ImportError:
-    HAS_SEMCHUNK = False
-    print("Warning: semchunk not available, using fallback chunking")
+# the Ollama client is loaded on the first embedding or chat call
+ollama = lazy_import("ollama")
 
 
 class GraphRAG:
@@ -19,55 +27,260 @@ class GraphRAG:
         language_model: str = 'llama3.2:3b',
         vector_size: int = 768,
         kuzu_db_path: str = "./kuzu_db",
-        qdrant_path: str = "./vector_db"
+        qdrant_path: str = "./vector_db",
+        upload_batch_size: int = 256,
+        upload_workers: int = 1,
+        embed_batch_size: int = 64,
+        embedding_cache_path: Optional[str] = "./embedding_cache",
+        embedding_cache_size: int = 100_000,
+        session_graph_cache_bytes: int = 64 * 1024 * 1024,
+        partition_by_session: bool = False,
+        skip_unchanged: bool = True,
+        chunk_overlap: int = 0,
+        chunk_workers: int = 1,
+        context_budget_tokens: int = 1024,
+        lexical_index_path: Optional[str] = "./lexical_index",
+        answer_cache_size: int = 256,
+        answer_cache_threshold: float = 0.95,
+        answer_cache_ttl: float = 3600.0
     ):
         self.embedding_model = embedding_model
+        self.vector_size = vector_size
         self.language_model = language_model
-        self.vector_db = QdrantDB(path=qdrant_path, vector_size=vector_size)
-        self.graph_db = KuzuDB(kuzu_db_path)
+        # the stores are opened on first use (see the vector_db / graph_db properties)
+        self._vector_db_options = dict(
+            path=qdrant_path,
+            vector_size=vector_size,
+            partition_by_session=partition_by_session,
+            upload_batch_size=upload_batch_size,
+            upload_workers=upload_workers
+        )
+        self._kuzu_db_path = kuzu_db_path
+        self._session_graph_cache_bytes = session_graph_cache_bytes
+        self._vector_db: Optional[QdrantDB] = None
+        self._graph_db: Optional[KuzuDB] = None
+        self._session_graphs: Optional[SessionGraphCache] = None
+        self._embedding_cache_path = embedding_cache_path
+        self._embedding_cache_size = embedding_cache_size
+        self._embedding_cache: Optional[EmbeddingCache] = None
+        self._lexical_index_path = lexical_index_path
+        self._lexical_index: Optional[LexicalIndex] = None
+        self._open_lock = threading.Lock()
         self.chunk_size = 256
+        self.chunk_overlap = chunk_overlap
+        self.chunk_workers = max(1, chunk_workers)
+        self.tokenizer = 'gpt-4'
         self.max_graph_depth = 2
+        self.context_budget_tokens = context_budget_tokens
+        self.context_similarity = 0.8
+        self.graph_context_chunks = 2
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.skip_unchanged = skip_unchanged
+        self.rrf_k = 60
+        self.query_bridge = QueryBridge()
+        self.answer_cache = None
+        if answer_cache_size > 0:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=answer_cache_threshold,
+                max_entries=answer_cache_size,
+                ttl=answer_cache_ttl
+            )
+
+    @property
+    def vector_db(self) -> QdrantDB:
+        """Qdrant store, opened on first use and shared with every other user of its path"""
+        if self._vector_db is None:
+            with self._open_lock:
+                if self._vector_db is None:
+                    self._vector_db = QdrantDB(**self._vector_db_options)
+        return self._vector_db
+
+    @vector_db.setter
+    def vector_db(self, store: QdrantDB):
+        self._vector_db = store
+
+    @property
+    def graph_db(self) -> KuzuDB:
+        """Kuzu store, opened on first use and shared with every other user of its path"""
+        if self._graph_db is None:
+            with self._open_lock:
+                if self._graph_db is None:
+                    self._graph_db = KuzuDB(self._kuzu_db_path)
+        return self._graph_db
+
+    @graph_db.setter
+    def graph_db(self, store: KuzuDB):
+        self._graph_db = store
+
+    @property
+    def session_graphs(self) -> SessionGraphCache:
+        if self._session_graphs is None:
+            graph_db = self.graph_db
+            with self._open_lock:
+                if self._session_graphs is None:
+                    self._session_graphs = SessionGraphCache(graph_db, max_bytes=self._session_graph_cache_bytes)
+        return self._session_graphs
+
+    @session_graphs.setter
+    def session_graphs(self, cache: SessionGraphCache):
+        self._session_graphs = cache
+
+    @property
+    def embedding_cache(self) -> Optional[EmbeddingCache]:
+        """On-disk embedding cache, opened on first use; None when disabled"""
+        if self._embedding_cache is None and self._embedding_cache_path:
+            with self._open_lock:
+                if self._embedding_cache is None:
+                    self._embedding_cache = EmbeddingCache(
+                        self._embedding_cache_path, max_entries=self._embedding_cache_size
+                    )
+        return self._embedding_cache
+
+    @embedding_cache.setter
+    def embedding_cache(self, cache: Optional[EmbeddingCache]):
+        self._embedding_cache = cache
+        self._embedding_cache_path = None
+
+    @property
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        """BM25 index, opened on first use; None when disabled"""
+        if self._lexical_index is None and self._lexical_index_path:
+            with self._open_lock:
+                if self._lexical_index is None:
+                    self._lexical_index = LexicalIndex(self._lexical_index_path)
+        return self._lexical_index
+
+    @lexical_index.setter
+    def lexical_index(self, index: Optional[LexicalIndex]):
+        self._lexical_index = index
+        self._lexical_index_path = None
+
+    def open(self):
+        """Open every store and load the Ollama client now instead of on the first request"""
+        self.vector_db
+        self.session_graphs
+        self.embedding_cache
+        self.lexical_index
+        ollama.Client
 
     def chunk_text(self, text: str) -> List[str]:
         """Chunk text using semantic chunking or fallback"""
         if not text or len(text.strip()) == 0:
             return []
         
-        try:
-            if HAS_SEMCHUNK:
-                chunker = semchunk.chunkerify('gpt-4', self.chunk_size)
-                return chunker(text)
-        except Exception as e:
-            print(f"Semchunk error: {e}, using fallback")
+        chunker = get_chunker(self.tokenizer, self.chunk_size)
+        if chunker is not None:
+            try:
+                return chunker(text, overlap=self.chunk_overlap or None)
+            except Exception as e:
+                print(f"Semchunk error: {e}, using fallback")
         
-        # Fallback: simple word-based chunking
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_size = 0
+        # Fallback: word-boundary chunking by character offsets
+        return fallback_chunks(text, self.chunk_size, self.chunk_overlap)
+
+    def chunk_texts(self, texts: List[str]) -> List[List[str]]:
+        """
+        Chunk many documents at once
         
-        for word in words:
-            current_chunk.append(word)
-            current_size += len(word) + 1
-            
-            if current_size > self.chunk_size:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = []
-                current_size = 0
+        With semchunk the documents are split across `chunk_workers`
+        processes; the fallback chunker is cheap enough to run inline.
+        """
+        chunker = get_chunker(self.tokenizer, self.chunk_size)
+        if chunker is not None:
+            try:
+                non_empty = [i for i, text in enumerate(texts) if text and text.strip()]
+                chunked = chunker(
+                    [texts[i] for i in non_empty],
+                    processes=self.chunk_workers,
+                    overlap=self.chunk_overlap or None
+                )
+                results: List[List[str]] = [[] for _ in texts]
+                for i, chunks in zip(non_empty, chunked):
+                    results[i] = chunks
+                return results
+            except Exception as e:
+                print(f"Semchunk error: {e}, using fallback")
         
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
+        return [
+            fallback_chunks(text, self.chunk_size, self.chunk_overlap) if text else []
+            for text in texts
+        ]
+
+    def embed_text(self, text: str) -> Optional[List[float]]:
+        """Generate embeddings using Ollama, None if embedding failed"""
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed many texts as lists of floats, None for texts that could not be embedded"""
+        matrix, ok = self.embed_matrix(texts)
+        return [row.tolist() if good else None for row, good in zip(matrix, ok)]
+
+    def embed_matrix(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed many texts into one float32 (len(texts), dim) matrix
+        
+        Repeats are served from the embedding cache. Texts not in the cache
+        are sent to Ollama in `embed_batch_size` batches. If a batch request
+        fails, its texts are retried one by one so a single bad input does
+        not sink the rest of the batch. Texts that still fail are marked
+        False in the returned mask, and their rows are left as zeros that
+        callers must not store.
+        """
+        if self.embedding_cache is None:
+            return self._embed_uncached(texts)
         
-        return chunks
+        matrix, ok = self.embedding_cache.lookup(self.embedding_model, texts)
+        missing = np.flatnonzero(~ok)
+        if len(missing) == 0:
+            return matrix, ok
+        
+        embedded, embedded_ok = self._embed_uncached([texts[i] for i in missing])
+        if matrix.shape[1] != embedded.shape[1]:
+            # nothing was cached yet, so the cache could not tell the vector size
+            matrix = np.zeros((len(texts), embedded.shape[1]), dtype=np.float32)
+        matrix[missing] = embedded
+        ok[missing] = embedded_ok
+        
+        new_rows = missing[embedded_ok]
+        if len(new_rows):
+            self.embedding_cache.put_many(
+                self.embedding_model, [texts[i] for i in new_rows], matrix[new_rows]
+            )
+        return matrix, ok
 
-    def embed_text(self, text: str) -> List[float]:
-        """Generate embeddings using Ollama"""
-        try:
-            resp = ollama.embed(model=self.embedding_model, input=text)
-            return resp["embeddings"][0]
-        except Exception as e:
-            print(f"Embedding error: {e}")
-            return [0.0] * 768  # Return zero vector on error
+    def _embed_uncached(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Embed texts with one Ollama request per `embed_batch_size` texts"""
+        matrix = np.zeros((len(texts), self.vector_size), dtype=np.float32)
+        ok = np.zeros(len(texts), dtype=bool)
+        
+        def fill(start: int, embeddings):
+            nonlocal matrix
+            rows = np.asarray(embeddings, dtype=np.float32)
+            if rows.shape[1] != matrix.shape[1] and not ok.any():
+                matrix = np.zeros((len(texts), rows.shape[1]), dtype=np.float32)
+            matrix[start:start + len(rows)] = rows
+            ok[start:start + len(rows)] = True
+        
+        for start in range(0, len(texts), self.embed_batch_size):
+            batch = texts[start:start + self.embed_batch_size]
+            try:
+                resp = ollama.embed(model=self.embedding_model, input=batch)
+                fill(start, resp["embeddings"])
+                continue
+            except Exception as e:
+                if len(batch) > 1:
+                    print(f"Batch embedding error: {e}, retrying {len(batch)} texts individually")
+                else:
+                    print(f"Embedding error: {e}")
+                    continue
+            
+            for offset, text in enumerate(batch):
+                try:
+                    resp = ollama.embed(model=self.embedding_model, input=text)
+                    fill(start + offset, resp["embeddings"][:1])
+                except Exception as e:
+                    print(f"Embedding error: {e}")
+        return matrix, ok
 
     def index_document(
         self,
@@ -86,34 +299,171 @@ class GraphRAG:
             if not chunks:
                 print(f"Warning: No chunks generated for {url}")
                 return False
+            self.trim_chunks({url: len(chunks)}, session_id)
             
-            vectors = [self.embed_text(chunk) for chunk in chunks]
-            
-            # Prepare payloads with document metadata
-            ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
-            payloads = [
-                {
-                    "doc_id": doc_id,
-                    "url": url,
-                    "chunk_idx": i,
-                    "text": chunk,
-                    "session_id": session_id
-                }
-                for i, chunk in enumerate(chunks)
-            ]
-            
-            # Store in vector DB
-            self.vector_db.upsert_points(ids, vectors, payloads)
-            return True
+            pending = self.pending_chunks(url, chunks, session_id)
+            if not pending:
+                return True
+            vectors, ok = self.embed_matrix([chunks[i] for i in pending])
+            return self.store_chunks(doc_id, url, chunks, vectors, session_id, indices=pending, ok=ok) > 0
         
         except Exception as e:
             print(f"Index document error: {e}")
             return False
 
+    def store_chunks(
+        self,
+        doc_id: str,
+        url: str,
+        chunks: List[str],
+        vectors: np.ndarray,
+        session_id: str,
+        indices: Optional[List[int]] = None,
+        ok: Optional[np.ndarray] = None
+    ) -> int:
+        """
+        Store embedded chunks of a document in the vector DB, skipping failed embeddings
+        
+        `vectors` is a (n, dim) matrix. `indices` names the chunk each row
+        belongs to when only some of the document's chunks were embedded (by
+        default rows line up with chunks), and `ok` masks out rows whose
+        embedding failed.
+        """
+        if indices is None:
+            indices = list(range(len(chunks)))
+        if ok is None:
+            ok = np.ones(len(indices), dtype=bool)
+        kept = [i for i, good in zip(indices, ok) if good]
+        if len(kept) < len(indices):
+            print(f"Warning: {len(indices) - len(kept)} of {len(indices)} chunks of {url} could not be embedded")
+        if not kept:
+            return 0
+        
+        # Prepare payloads with document metadata
+        ids = [self.chunk_key(session_id, url, i) for i in kept]
+        payloads = [
+            {
+                "doc_id": doc_id,
+                "url": url,
+                "chunk_idx": i,
+                "text": chunks[i],
+                "session_id": session_id,
+                "content_hash": self.content_hash(chunks[i])
+            }
+            for i in kept
+        ]
+        
+        # Store in vector DB
+        rows = vectors if ok.all() else vectors[ok]
+        self.vector_db.upsert_points(ids, rows, payloads)
+        if self.lexical_index is not None:
+            self.lexical_index.add_many(session_id, ids, [chunks[i] for i in kept])
+        self._invalidate_answers(session_id)
+        return len(kept)
+
+    def trim_chunks(self, chunk_counts: Dict[str, int], session_id: str) -> int:
+        """
+        Remove the chunks a document had past its current chunk count
+        
+        Chunks are upserted by (url, chunk_idx), so when a re-indexed page
+        comes out shorter its old tail would otherwise stay searchable in
+        Qdrant and the lexical index. Returns the number of chunks removed.
+        """
+        try:
+            removed = self.vector_db.trim_chunks(chunk_counts, session_id)
+        except Exception as e:
+            print(f"Trim chunks error: {e}")
+            return 0
+        if removed:
+            if self.lexical_index is not None:
+                self.lexical_index.remove_many(session_id, [self.chunk_key(session_id, url, i) for url, i in removed])
+            self._invalidate_answers(session_id)
+        return len(removed)
+
+    def pending_chunks(self, url: str, chunks: List[str], session_id: str) -> List[int]:
+        """Indices of chunks that need embedding, leaving out ones stored with identical text"""
+        if not self.skip_unchanged or not chunks:
+            return list(range(len(chunks)))
+        keys = [self.chunk_key(session_id, url, i) for i in range(len(chunks))]
+        try:
+            unchanged = self.vector_db.unchanged_ids(
+                keys,
+                [self.content_hash(chunk) for chunk in chunks],
+                session_id=session_id
+            )
+        except Exception as e:
+            print(f"Unchanged chunk lookup error: {e}")
+            unchanged = set()
+        return [i for i, key in enumerate(keys) if key not in unchanged]
+
+    @staticmethod
+    def chunk_key(session_id: str, url: str, chunk_idx: int) -> str:
+        """Identity of a chunk; re-indexing the same chunk overwrites its point"""
+        return f"{session_id}\x1f{url}\x1f{chunk_idx}"
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def index_documents(self, documents: List[tuple], session_id: str) -> int:
+        """
+        Index several (doc_id, url, content) documents with coalesced embedding
+        
+        Chunks of all documents are embedded together in `embed_batch_size`
+        batches, so many small pages cost a handful of embedding requests.
+        Chunks already stored with the same text are skipped.
+        Returns the number of documents that were stored or already up to date.
+        """
+        return self._index_documents(documents, session_id)[0]
+
+    def _index_documents(self, documents: List[tuple], session_id: str) -> Tuple[int, List[str]]:
+        """index_documents, also returning the URLs whose every chunk is now stored"""
+        self.graph_db.insert_nodes([url for _, url, _ in documents], session_id)
+        
+        chunked = []
+        all_chunks = self.chunk_texts([content for _, _, content in documents])
+        for (doc_id, url, _), chunks in zip(documents, all_chunks):
+            if not chunks:
+                print(f"Warning: No chunks generated for {url}")
+                continue
+            chunked.append((doc_id, url, chunks, self.pending_chunks(url, chunks, session_id)))
+        self.trim_chunks({url: len(chunks) for _, url, chunks, _ in chunked}, session_id)
+        
+        vectors, ok = self.embed_matrix([
+            chunks[i] for _, _, chunks, pending in chunked for i in pending
+        ])
+        
+        indexed = 0
+        complete = []
+        offset = 0
+        for doc_id, url, chunks, pending in chunked:
+            rows = slice(offset, offset + len(pending))
+            offset += len(pending)
+            if not pending:
+                indexed += 1
+                complete.append(url)
+                continue
+            try:
+                stored = self.store_chunks(doc_id, url, chunks, vectors[rows], session_id, indices=pending, ok=ok[rows])
+                if stored:
+                    indexed += 1
+                # a page with chunks that failed to embed is not complete
+                if stored == len(pending):
+                    complete.append(url)
+            except Exception as e:
+                print(f"Index document error: {e}")
+        return indexed, complete
+
+    @staticmethod
+    def doc_id_for(url: str) -> str:
+        """Derive the document id used for a crawled URL"""
+        return url.replace("https://", "").replace("http://", "").replace("/", "_")[:50]
+
     def link_documents(self, from_url: str, to_url: str, session_id: str) -> bool:
         """Create edge between two documents in graph DB"""
         try:
-            self.graph_db.insert_rel(from_url, to_url, session_id)
+            self.graph_db.insert_rels([(from_url, to_url)], session_id)
+            self._invalidate_answers(session_id)
             return True
         except Exception as e:
             print(f"Error linking documents: {e}")
@@ -131,143 +481,336 @@ class GraphRAG:
         1. Vector similarity search (semantic)
         2. Graph traversal to find related documents
         """
+        return self.retrieve_many([query], session_id, top_k=top_k, use_graph=use_graph)[0]
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        session_id: str,
+        top_k: int = 5,
+        use_graph: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve documents for a burst of queries at once
+        
+        All queries are embedded in one embedding request and searched with
+        one batched Qdrant call; the graph neighborhoods of every query's
+        seeds are then expanded together in a single pass.
+        
+        Returns one list of documents per query, in the same order. A
+        document's `score` is its cosine similarity to the query (0.0 for
+        chunks only BM25 found); with the lexical index on, vector and
+        keyword hits also carry their reciprocal rank fusion score in
+        `rrf_score`, which decides their order.
+        """
+        try:
+            query_vecs, ok = self.embed_matrix(queries)
+        except Exception as e:
+            print(f"Retrieval error: {e}")
+            return [[] for _ in queries]
+        return self._retrieve_vectors(queries, query_vecs, ok, session_id, top_k, use_graph)
+
+    def _retrieve_vectors(
+        self,
+        queries: List[str],
+        query_vecs: np.ndarray,
+        ok: np.ndarray,
+        session_id: str,
+        top_k: int = 5,
+        use_graph: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """retrieve_many for queries that are already embedded"""
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
         try:
             # Step 1: Vector search for semantically relevant chunks
-            query_vec = self.embed_text(query)
-            vector_results = self.vector_db.query(query_vec, limit=top_k)
+            vector_hits: List[List[Tuple[str, Dict[str, Any], float]]] = [[] for _ in queries]
+            valid = np.flatnonzero(ok).tolist()
+            if valid:
+                batch_results = self.vector_db.query_batch(
+                    query_vecs[ok], limit=top_k, session_id=session_id
+                )
+                for i, vector_results in zip(valid, batch_results):
+                    vector_hits[i] = [(str(r.id), r.payload, float(r.score)) for r in vector_results]
             
-            retrieved_docs = []
-            retrieved_urls = set()
+            # Step 1b: Keyword search over the session's BM25 index, fused with the vector hits
+            if self.lexical_index is not None:
+                hits = self._fuse_keyword_hits(queries, vector_hits, session_id, top_k)
+            else:
+                hits = [[(payload, score, None, "vector_search") for _, payload, score in vh] for vh in vector_hits]
             
-            # Convert vector results to document format
-            for result in vector_results:
-                payload = result.payload
-                url = payload.get("url")
-                retrieved_urls.add(url)
-                retrieved_docs.append({
-                    "type": "vector_search",
-                    "url": url,
-                    "text": payload.get("text"),
-                    "score": float(result.score),
-                    "doc_id": payload.get("doc_id"),
-                    "depth": 0
-                })
+            # Convert search results to document format
+            for i, query_hits in enumerate(hits):
+                for payload, score, rrf_score, doc_type in query_hits:
+                    doc = {
+                        "type": doc_type,
+                        "url": payload.get("url"),
+                        "text": payload.get("text"),
+                        "score": score,
+                        "doc_id": payload.get("doc_id"),
+                        "chunk_idx": payload.get("chunk_idx"),
+                        "depth": 0
+                    }
+                    if rrf_score is not None:
+                        doc["rrf_score"] = rrf_score
+                    results[i].append(doc)
             
             # Step 2: Graph traversal to find related documents
-            if use_graph and retrieved_docs:
-                for doc in retrieved_docs[:]:
-                    url = doc["url"]
-                    related_docs = self._traverse_graph(url, session_id, depth=0)
-                    
-                    for related in related_docs:
+            if use_graph:
+                seeds = list(dict.fromkeys(doc["url"] for docs in results for doc in docs))
+                neighborhoods = self._neighborhoods(seeds, session_id)
+                for docs in results:
+                    retrieved_urls = {doc["url"] for doc in docs}
+                    for related in self._related_docs(retrieved_urls, neighborhoods):
                         if related["url"] not in retrieved_urls:
-                            retrieved_docs.append(related)
+                            docs.append(related)
                             retrieved_urls.add(related["url"])
             
-            return retrieved_docs
+            return results
         
         except Exception as e:
             print(f"Retrieval error: {e}")
-            return []
+            return [[] for _ in queries]
 
-    def _traverse_graph(
+    def query_keywords(self, query: str) -> List[str]:
+        """Keywords of a query for the lexical index"""
+        return self.query_bridge.transform(query).split()
+
+    def _fuse_keyword_hits(
         self,
-        start_url: str,
+        queries: List[str],
+        vector_hits: List[List[Tuple[str, Dict[str, Any], float]]],
         session_id: str,
-        depth: int = 0,
-        max_depth: int = 2,
-        visited: Optional[set] = None
-    ) -> List[Dict[str, Any]]:
-        """Recursively traverse graph to find related documents"""
-        if visited is None:
-            visited = set()
-        
-        if depth >= max_depth or start_url in visited:
-            return []
+        top_k: int
+    ) -> List[List[Tuple[Dict[str, Any], float, float, str]]]:
+        """
+        Reciprocal rank fusion of vector and BM25 hits, per query
         
-        visited.add(start_url)
-        related_docs = []
+        Every list contributes 1 / (rrf_k + rank) for each chunk it ranks;
+        chunks found only by keyword are resolved to their payloads with a
+        single Qdrant lookup for the whole batch of queries. Returns
+        (payload, vector similarity, fused score, type) in fused order.
+        """
+        keyword_hits = [
+            [(QdrantDB.point_id(key), key) for key, _ in self.lexical_index.search(
+                session_id, self.query_keywords(query), limit=top_k
+            )]
+            for query in queries
+        ]
+        payloads: Dict[str, Dict[str, Any]] = {
+            point: payload for hits in vector_hits for point, payload, _ in hits
+        }
+        missing = list(dict.fromkeys(
+            key for hits in keyword_hits for point, key in hits if point not in payloads
+        ))
+        for key, payload in self.vector_db.get_payloads(missing, session_id).items():
+            payloads[QdrantDB.point_id(key)] = payload
         
+        fused_hits = []
+        for v_hits, k_hits in zip(vector_hits, keyword_hits):
+            fused: Dict[str, float] = {}
+            for rank, (point, _, _) in enumerate(v_hits, start=1):
+                fused[point] = fused.get(point, 0.0) + 1.0 / (self.rrf_k + rank)
+            for rank, (point, _) in enumerate(k_hits, start=1):
+                if point in payloads:
+                    fused[point] = fused.get(point, 0.0) + 1.0 / (self.rrf_k + rank)
+            similarity = {point: score for point, _, score in v_hits}
+            best = heapq.nlargest(top_k, fused.items(), key=lambda item: item[1])
+            fused_hits.append([
+                (
+                    payloads[point],
+                    similarity.get(point, 0.0),
+                    score,
+                    "vector_search" if point in similarity else "keyword_search"
+                )
+                for point, score in best
+            ])
+        return fused_hits
+
+    def _neighborhoods(self, seed_urls: List[str], session_id: str) -> Dict[str, Dict[str, int]]:
+        """Neighbors within `max_graph_depth` hops of each seed URL, from the session's cached adjacency"""
+        if not seed_urls:
+            return {}
         try:
-            neighbors = self.graph_db.get_neighbors(start_url, session_id, depth=1)
-            
-            for url in neighbors:
-                if url and url not in visited:
-                    related_docs.append({
-                        "type": "graph_traversal",
-                        "url": url,
-                        "text": f"Related document from knowledge graph",
-                        "score": 0.5 ** (depth + 1),
-                        "depth": depth + 1
-                    })
-                    
-                    # Continue traversal
-                    deeper = self._traverse_graph(
-                        url, session_id, depth + 1, max_depth, visited
-                    )
-                    related_docs.extend(deeper)
-        
+            return self.session_graphs.get_neighborhoods(seed_urls, session_id, self.max_graph_depth)
         except Exception as e:
             print(f"Graph traversal error: {e}")
-        
-        return related_docs
+            return {}
 
-    def aggregate_context(self, docs: List[Dict[str, Any]]) -> str:
-        """Aggregate retrieved documents into a cohesive context"""
-        context_parts = []
-        
-        # Sort by depth (prefer closer nodes) and score
-        sorted_docs = sorted(
-            docs,
-            key=lambda x: (x.get("depth", 0), -x.get("score", 0))
-        )
+    def _related_docs(self, seed_urls, neighborhoods: Dict[str, Dict[str, int]]) -> List[Dict[str, Any]]:
+        """Graph documents reachable from the given seeds, each at its closest distance"""
+        hops: Dict[str, int] = {}
+        for seed in seed_urls:
+            for url, depth in neighborhoods.get(seed, {}).items():
+                if url and depth < hops.get(url, depth + 1):
+                    hops[url] = depth
         
-        for doc in sorted_docs[:10]:
-            text = doc.get("text", "")
-            url = doc.get("url", "")
-            doc_type = doc.get("type", "")
-            
-            if text and text.strip():
-                context_parts.append(f"[{doc_type}] {url}:\n{text}")
+        return [
+            {
+                "type": "graph_traversal",
+                "url": url,
+                "text": f"Related document from knowledge graph",
+                "score": 0.5 ** depth,
+                "depth": depth
+            }
+            for url, depth in sorted(hops.items(), key=lambda item: (item[1], item[0]))
+        ]
+
+    def aggregate_context(self, docs: List[Dict[str, Any]], session_id: Optional[str] = None) -> str:
+        """
+        Aggregate retrieved documents into a context of about `context_budget_tokens` tokens
         
-        return "\n\n".join(context_parts) if context_parts else "No context found."
+        Graph-traversal results only name a related URL. Given the session,
+        the first `graph_context_chunks` chunks of every such URL are
+        fetched from Qdrant in one lookup; without it they are left out.
+        Near-identical chunks are dropped and neighbouring chunks of a page
+        are merged (see rag.context.build_context).
+        """
+        docs = self._with_graph_text(docs, session_id)
+        return build_context(docs, self.context_budget_tokens, self.context_similarity)
 
-    def generate_response(self, query: str, context: str) -> str:
-        """Generate response using LLM with aggregated context"""
+    def _with_graph_text(self, docs: List[Dict[str, Any]], session_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Replace graph-traversal placeholders by the real leading chunks of their pages"""
+        graph_docs = [doc for doc in docs if doc.get("type") == "graph_traversal"]
+        if not graph_docs:
+            return docs
+        resolved = [doc for doc in docs if doc.get("type") != "graph_traversal"]
+        if session_id is None:
+            return resolved
         try:
-            system_prompt = """You are an intelligent assistant with access to a knowledge graph.
+            chunks = self.vector_db.leading_chunks(
+                [doc["url"] for doc in graph_docs], session_id, per_url=self.graph_context_chunks
+            )
+        except Exception as e:
+            print(f"Graph context error: {e}")
+            return resolved
+        for doc in graph_docs:
+            for payload in chunks.get(doc["url"], []):
+                resolved.append({
+                    **doc,
+                    "text": payload.get("text", ""),
+                    "doc_id": payload.get("doc_id"),
+                    "chunk_idx": payload.get("chunk_idx")
+                })
+        return resolved
+
+    GENERATION_ERROR = "Error generating response"
+
+    SYSTEM_PROMPT = """You are an intelligent assistant with access to a knowledge graph.
 Use the provided context from related documents to answer the user's query comprehensively.
 When citing information, reference the source documents when possible.
 If context is insufficient, acknowledge limitations and provide what you know."""
-            
+
+    def _chat_messages(self, query: str, context: str) -> List[Dict[str, str]]:
+        return [
+            {'role': 'system', 'content': self.SYSTEM_PROMPT},
+            {'role': 'user', 'content': f"Context from knowledge graph:\n{context}\n\nUser question: {query}"}
+        ]
+
+    def generate_response(self, query: str, context: str) -> str:
+        """Generate response using LLM with aggregated context"""
+        try:
             response = ollama.chat(
                 model=self.language_model,
-                messages=[
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': f"Context from knowledge graph:\n{context}\n\nUser question: {query}"}
-                ]
+                messages=self._chat_messages(query, context)
             )
             
             return response["message"]["content"]
         
         except Exception as e:
             print(f"Generation error: {e}")
-            return f"Error generating response: {str(e)}"
+            return f"{self.GENERATION_ERROR}: {str(e)}"
+
+    def generate_stream(self, query: str, context: str) -> Iterator[str]:
+        """Like generate_response, but yields the answer token by token as the LLM produces it"""
+        try:
+            for part in ollama.chat(
+                model=self.language_model,
+                messages=self._chat_messages(query, context),
+                stream=True
+            ):
+                token = part["message"]["content"]
+                if token:
+                    yield token
+        
+        except Exception as e:
+            print(f"Generation error: {e}")
+            yield f"{self.GENERATION_ERROR}: {str(e)}"
+
+    def _query_vector(self, query: str) -> Optional[np.ndarray]:
+        vectors, ok = self.embed_matrix([query])
+        return vectors[0] if ok[0] else None
+
+    def _invalidate_answers(self, session_id: str):
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(session_id)
+
+    def cached_answer(
+        self,
+        query: str,
+        session_id: str,
+        vector: Optional[np.ndarray] = None
+    ) -> Optional[CachedAnswer]:
+        """Answer of an earlier, semantically equivalent query in the session, if still cached"""
+        if self.answer_cache is None:
+            return None
+        if vector is None:
+            vector = self._query_vector(query)
+        if vector is None:
+            return None
+        return self.answer_cache.lookup(session_id, vector)
+
+    def remember_answer(
+        self,
+        query: str,
+        session_id: str,
+        docs: List[Dict[str, Any]],
+        answer: str,
+        vector: Optional[np.ndarray] = None
+    ):
+        """Put a generated answer in the semantic answer cache; failed generations are not kept"""
+        if self.answer_cache is None or not docs or answer.startswith(self.GENERATION_ERROR):
+            return
+        if vector is None:
+            vector = self._query_vector(query)
+        if vector is not None:
+            self.answer_cache.store(session_id, vector, answer, docs)
+
+    def retrieve_for_answer(self, query: str, session_id: str) -> Tuple[Optional[np.ndarray], Any]:
+        """
+        Embed the query once and use it for the cache lookup and retrieval
+        
+        Returns (query vector, cached answer) on a cache hit and
+        (query vector, retrieved documents) otherwise.
+        """
+        vectors, ok = self.embed_matrix([query])
+        vector = vectors[0] if ok[0] else None
+        hit = self.cached_answer(query, session_id, vector) if vector is not None else None
+        if hit is not None:
+            return vector, hit
+        return vector, self._retrieve_vectors([query], vectors, ok, session_id, top_k=5, use_graph=True)[0]
 
     def answer(self, query: str, session_id: str) -> str:
-        """Complete Graph-RAG pipeline: retrieve -> aggregate -> generate"""
+        """
+        Complete Graph-RAG pipeline: retrieve -> aggregate -> generate
+        
+        Near-repeats of an earlier query in the same session are answered
+        from the semantic answer cache without retrieval or generation.
+        """
         try:
-            # Retrieve with graph traversal
-            docs = self.retrieve_with_graph_traversal(query, session_id, top_k=5, use_graph=True)
+            # Retrieve with graph traversal, unless the answer is cached
+            vector, docs = self.retrieve_for_answer(query, session_id)
+            if isinstance(docs, CachedAnswer):
+                return docs.answer
             
             if not docs:
                 return "No relevant documents found in knowledge graph."
             
             # Aggregate context from graph and vectors
-            context = self.aggregate_context(docs)
+            context = self.aggregate_context(docs, session_id)
             
             # Generate response
             response = self.generate_response(query, context)
+            self.remember_answer(query, session_id, docs, response, vector)
             
             return response
         
@@ -275,11 +818,43 @@ If context is insufficient, acknowledge limitations and provide what you know.""
             print(f"Answer error: {e}")
             return f"Error: {str(e)}"
 
+    def answer_stream(self, query: str, session_id: str) -> Iterator[str]:
+        """Streaming variant of `answer`: retrieve and aggregate, then yield LLM tokens as they arrive"""
+        try:
+            vector, docs = self.retrieve_for_answer(query, session_id)
+        except Exception as e:
+            print(f"Answer error: {e}")
+            yield f"Error: {str(e)}"
+            return
+        
+        if isinstance(docs, CachedAnswer):
+            yield docs.answer
+            return
+        
+        if not docs:
+            yield "No relevant documents found in knowledge graph."
+            return
+        
+        tokens = []
+        for token in self.generate_stream(query, self.aggregate_context(docs, session_id)):
+            tokens.append(token)
+            yield token
+        self.remember_answer(query, session_id, docs, "".join(tokens), vector)
+
+    def flush(self):
+        """Persist the embedding cache and the lexical index"""
+        # stores that were never opened have nothing to write
+        if self._embedding_cache is not None:
+            self._embedding_cache.flush()
+        if self._lexical_index is not None:
+            self._lexical_index.flush()
+
     def bulk_index_from_crawler(
         self,
         crawler_relations: List[tuple],
         documents: Dict[str, str],
-        session_id: str
+        session_id: str,
+        state=None
     ) -> bool:
         """
         Index documents from web crawler output
@@ -288,25 +863,80 @@ If context is insufficient, acknowledge limitations and provide what you know.""
             crawler_relations: List of (parent_url, child_url) tuples
             documents: Dict mapping URL -> content
             session_id: Session identifier for grouping
+            state: The CrawlStateStore the crawl staged its pages in; only
+                pages whose chunks were all stored are committed to it
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Index all documents
-            for i, (url, content) in enumerate(documents.items()):
-                doc_id = url.replace("https://", "").replace("http://", "").replace("/", "_")[:50]
-                success = self.index_document(doc_id, url, content, session_id)
-                if not success:
-                    print(f"Warning: Failed to index {url}")
+            # Index documents in groups so embedding requests are shared across pages
+            group = []
+            for url, content in documents.items():
+                group.append((self.doc_id_for(url), url, content))
+                if len(group) >= self.embed_batch_size:
+                    self._commit_indexed(state, self._index_documents(group, session_id)[1])
+                    group = []
+            if group:
+                self._commit_indexed(state, self._index_documents(group, session_id)[1])
             
-            # Create graph links
-            for parent_url, child_url in crawler_relations:
-                self.link_documents(parent_url, child_url, session_id)
+            # Create graph links in one bulk transaction
+            self.graph_db.insert_rels(crawler_relations, session_id)
+            self._invalidate_answers(session_id)
             
+            self.flush()
             print(f"Indexed {len(documents)} documents with {len(crawler_relations)} relationships")
             return True
         
         except Exception as e:
             print(f"Bulk index error: {e}")
-            return False
\ No newline at end of file
+            return False
+        finally:
+            if state is not None:
+                state.flush()
+
+    @staticmethod
+    def _commit_indexed(state, urls: List[str]):
+        if state is not None:
+            for url in urls:
+                state.commit(url)
+
+    def stream_index_from_crawler(
+        self,
+        start_url: str,
+        session_id: str,
+        max_depth: int = 2,
+        queue_size: int = 32,
+        **crawler_options
+    ) -> bool:
+        """
+        Crawl `start_url` and index pages while the crawl is still running
+        
+        Pages flow through bounded queues into chunking, embedding and
+        Qdrant/Kuzu writes, so memory stays flat with crawl size and a slow
+        embedder throttles the crawler instead of piling pages up.
+        
+        Args:
+            start_url: URL the crawl starts from
+            session_id: Session identifier for grouping
+            max_depth: Maximum link depth to crawl
+            queue_size: Capacity of each queue between pipeline stages
+            crawler_options: Extra keyword arguments for AsyncCrawler
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        from rag.pipeline import StreamingIndexer
+        
+        try:
+            indexer = StreamingIndexer(self, session_id, queue_size=queue_size)
+            stats = asyncio.run(indexer.run(start_url, max_depth=max_depth, **crawler_options))
+            self.flush()
+            print(f"Indexed {stats.documents} documents with {stats.relations} relationships "
+                  f"({stats.saved_fetches} duplicate URLs not fetched, "
+                  f"{stats.near_duplicates} near-duplicate pages not embedded)")
+            return True
+        
+        except Exception as e:
+            print(f"Stream index error: {e}")
+            return False
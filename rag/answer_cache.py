@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+
+class CachedAnswer(NamedTuple):
+    answer: str
+    sources: List[str]
+    created: float
+
+
+class _SessionAnswers:
+    """Answers of one session; unit query vectors live in one matrix for a single matmul per lookup"""
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self.free = list(range(capacity - 1, -1, -1))
+
+
+class SemanticAnswerCache:
+    """
+    Per-session cache of generated answers, looked up by query embedding.
+
+    A query hits when its cosine similarity to an earlier query of the same
+    session is at least `threshold`. Each session keeps up to `max_entries`
+    answers in least-recently-used order, entries expire after `ttl`
+    seconds, and at most `max_sessions` sessions are kept.
+    `invalidate(session_id)` drops a session once its documents change.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 256,
+        ttl: float = 3600.0,
+        max_sessions: int = 1024
+    ):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._sessions: "OrderedDict[str, _SessionAnswers]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, session_id: str, vector) -> Optional[CachedAnswer]:
+        """Answer to the most similar earlier query of the session, if it is close enough"""
+        unit = self._unit(vector)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if unit is None or session is None or not session.entries or session.vectors.shape[1] != len(unit):
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self._expire(session)
+            slots = np.fromiter(session.entries, dtype=np.int64, count=len(session.entries))
+            if len(slots):
+                scores = session.vectors[slots] @ unit
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    slot = int(slots[best])
+                    session.entries.move_to_end(slot)
+                    self.hits += 1
+                    return session.entries[slot]
+            self.misses += 1
+            return None
+
+    def store(self, session_id: str, vector, answer: str, docs: List[Dict]):
+        """Remember the answer generated for a query from the retrieved `docs`"""
+        unit = self._unit(vector)
+        if unit is None:
+            return
+        entry = CachedAnswer(
+            answer,
+            list(dict.fromkeys(doc.get("url") for doc in docs)),
+            time.monotonic()
+        )
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.vectors.shape[1] != len(unit):
+                session = self._sessions[session_id] = _SessionAnswers(self.max_entries, len(unit))
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            self._expire(session)
+            if session.free:
+                slot = session.free.pop()
+            else:
+                slot, _ = session.entries.popitem(last=False)
+                self.evictions += 1
+            session.vectors[slot] = unit
+            session.entries[slot] = entry
+
+    def _expire(self, session: _SessionAnswers):
+        if self.ttl is None:
+            return
+        cutoff = time.monotonic() - self.ttl
+        for slot in [slot for slot, entry in session.entries.items() if entry.created < cutoff]:
+            del session.entries[slot]
+            session.free.append(slot)
+            self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        """Forget every answer of a session, e.g. after its documents were re-indexed"""
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "entries": sum(len(s.entries) for s in self._sessions.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
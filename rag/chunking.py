@@ -0,0 +1,74 @@
+import importlib.util
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# semchunk (and the tokenizer stack behind it) is imported on first use
+HAS_SEMCHUNK = importlib.util.find_spec("semchunk") is not None
+if not HAS_SEMCHUNK:
+    print("Warning: semchunk not available, using fallback chunking")
+
+_WORD_START = re.compile(r"(?<!\S)\S")
+_chunkers: Dict[Tuple[str, int], object] = {}
+_chunkers_lock = threading.Lock()
+
+
+def get_chunker(tokenizer: str, chunk_size: int):
+    """Return the semchunk chunker for (tokenizer, chunk_size), built once and shared; None if unavailable"""
+    key = (tokenizer, chunk_size)
+    if key in _chunkers:
+        return _chunkers[key]
+    with _chunkers_lock:
+        if key not in _chunkers:
+            chunker = None
+            if HAS_SEMCHUNK:
+                try:
+                    import semchunk
+                    chunker = semchunk.chunkerify(tokenizer, chunk_size)
+                except Exception as e:
+                    print(f"Semchunk error: {e}, using fallback")
+            _chunkers[key] = chunker
+        return _chunkers[key]
+
+
+@lru_cache(maxsize=32)
+def _chunk_pattern(chunk_size: int) -> "re.Pattern":
+    """Regex matching the longest run of whole words that fits in chunk_size characters"""
+    if chunk_size < 2:
+        return re.compile(r"\S+")
+    return re.compile(r"\S(?:.{0,%d}\S)?(?!\S)|\S+" % (chunk_size - 2), re.DOTALL)
+
+
+def chunk_offsets(text: str, chunk_size: int, overlap: int = 0) -> List[Tuple[int, int]]:
+    """
+    Split text at word boundaries into (start, end) character spans.
+
+    Each span covers as many whole words as fit in `chunk_size` characters
+    (a single longer word gets a span of its own). Consecutive spans share
+    roughly `overlap` characters. The scanning is done by one compiled regex,
+    so the per-word work stays in C.
+    """
+    pattern = _chunk_pattern(chunk_size)
+    if overlap <= 0:
+        return [m.span() for m in pattern.finditer(text)]
+
+    offsets = []
+    pos = 0
+    while True:
+        m = pattern.search(text, pos)
+        if m is None:
+            break
+        start, end = m.span()
+        offsets.append((start, end))
+        # next chunk starts at the first word beginning inside the overlap window
+        nxt = _WORD_START.search(text, max(end - overlap, start + 1))
+        if nxt is None:
+            break
+        pos = nxt.start()
+    return offsets
+
+
+def fallback_chunks(text: str, chunk_size: int, overlap: int = 0) -> List[str]:
+    """Word-boundary chunking without a tokenizer, returning slices of text"""
+    return [text[start:end] for start, end in chunk_offsets(text, chunk_size, overlap)]
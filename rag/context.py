@@ -0,0 +1,86 @@
+import heapq
+import re
+from typing import Any, Dict, FrozenSet, List
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English BPE vocabularies)"""
+    return len(text) // 4 + 1
+
+
+def _words(text: str) -> FrozenSet[str]:
+    return frozenset(_WORD.findall(text.lower()))
+
+
+def _similar(a: FrozenSet[str], b: FrozenSet[str], threshold: float) -> bool:
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= threshold
+
+
+def select_docs(docs: List[Dict[str, Any]], budget_tokens: int, similarity: float = 0.8) -> List[Dict[str, Any]]:
+    """
+    Pick the best documents that fit in `budget_tokens`.
+
+    Documents are ranked by graph depth, then fused `rrf_score` where
+    retrieval set one and `score` otherwise, through a heap, so only the
+    ones actually taken are ordered. Documents without text and
+    documents whose word set overlaps an already chosen one by at least
+    `similarity` (Jaccard) are skipped; a document too long for what is left
+    of the budget is skipped in favour of shorter ones further down.
+    """
+    heap = [
+        (doc.get("depth", 0), -doc.get("rrf_score", doc.get("score", 0.0)), n)
+        for n, doc in enumerate(docs)
+        if (doc.get("text") or "").strip()
+    ]
+    heapq.heapify(heap)
+
+    selected: List[Dict[str, Any]] = []
+    selected_words: List[FrozenSet[str]] = []
+    used = 0
+    while heap and used < budget_tokens:
+        doc = docs[heapq.heappop(heap)[2]]
+        cost = estimate_tokens(doc["text"]) + estimate_tokens(doc.get("url") or "")
+        if used + cost > budget_tokens:
+            continue
+        words = _words(doc["text"])
+        if any(_similar(words, other, similarity) for other in selected_words):
+            continue
+        selected.append(doc)
+        selected_words.append(words)
+        used += cost
+    return selected
+
+
+def build_context(docs: List[Dict[str, Any]], budget_tokens: int, similarity: float = 0.8) -> str:
+    """
+    Context string of at most about `budget_tokens` tokens.
+
+    After `select_docs`, chunks of the same URL are grouped under one header
+    in chunk order, with consecutive chunks joined into one passage. URLs
+    appear in the order of their best-ranked chunk.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for doc in select_docs(docs, budget_tokens, similarity):
+        groups.setdefault(doc.get("url") or "", []).append(doc)
+
+    parts = []
+    for url, chunks in groups.items():
+        doc_type = chunks[0].get("type", "")
+        chunks.sort(key=lambda d: d.get("chunk_idx", 0))
+        passages: List[List[str]] = []
+        previous = None
+        for doc in chunks:
+            idx = doc.get("chunk_idx")
+            if passages and idx is not None and previous is not None and idx == previous + 1:
+                passages[-1].append(doc["text"])
+            else:
+                passages.append([doc["text"]])
+            previous = idx
+        body = "\n...\n".join(" ".join(passage) for passage in passages)
+        parts.append(f"[{doc_type}] {url}:\n{body}")
+
+    return "\n\n".join(parts) if parts else "No context found."
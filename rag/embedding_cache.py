@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    On-disk, content-addressed cache of embedding vectors.
+
+    Vectors are keyed by (model name, hash of the text) and stored as float32
+    rows of a memory-mapped array (`vectors.f32`). `index.npy` maps 16-byte
+    keys to rows in least-recently-used order and `meta.json` records the
+    vector size. Once `max_entries` rows are in use the least recently used
+    entry is evicted and its row reused; evicted keys are appended to
+    `evicted.bin` before their rows are overwritten and dropped from the
+    index when it is loaded, so the index on disk never maps an old key to
+    a new vector. Otherwise nothing is written until `flush()`, which also
+    saves the recency order of lookups.
+    """
+
+    _GROW_BY = 1024
+    _INDEX_DTYPE = np.dtype([("key", "S16"), ("slot", "<i4")])
+
+    def __init__(self, path: str = "./embedding_cache", max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._dim = 0
+        self._rows = 0
+        self._vectors: Optional[np.memmap] = None
+        self._dirty = False
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        """Cache key of a text embedded with `model`"""
+        return hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    @property
+    def _meta_file(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def _index_file(self) -> str:
+        return os.path.join(self.path, "index.npy")
+
+    @property
+    def _vector_file(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _evicted_file(self) -> str:
+        return os.path.join(self.path, "evicted.bin")
+
+    def _load(self):
+        try:
+            with open(self._meta_file, "r") as f:
+                meta = json.load(f)
+            index = np.load(self._index_file)
+            self._dim = meta["dim"]
+            self._rows = meta["rows"]
+            # numpy strips trailing NUL bytes from fixed-width bytes fields
+            keys = (k.ljust(16, b"\0") for k in index["key"].tolist())
+            self._entries = OrderedDict(zip(keys, index["slot"].tolist()))
+            # rows evicted after the index was saved may have been overwritten since
+            for key in self._read_evicted():
+                self._entries.pop(key, None)
+            self._vectors = np.memmap(self._vector_file, dtype=np.float32, mode="r+", shape=(self._rows, self._dim))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Embedding cache reset: {e}")
+            self._dim = self._rows = 0
+            self._entries = OrderedDict()
+            self._vectors = None
+            return
+        used = set(self._entries.values())
+        self._free = [slot for slot in range(self._rows - 1, -1, -1) if slot not in used]
+
+    def _read_evicted(self) -> List[bytes]:
+        try:
+            with open(self._evicted_file, "rb") as f:
+                log = f.read()
+        except FileNotFoundError:
+            return []
+        return [log[i:i + 16] for i in range(0, len(log) - len(log) % 16, 16)]
+
+    def _grow(self, dim: int):
+        rows = min(self.max_entries, max(self._rows * 2, self._rows + self._GROW_BY))
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        with open(self._vector_file, "ab") as f:
+            f.truncate(rows * dim * 4)
+        self._vectors = np.memmap(self._vector_file, dtype=np.float32, mode="r+", shape=(rows, dim))
+        self._free.extend(range(rows - 1, self._rows - 1, -1))
+        self._dim = dim
+        self._rows = rows
+
+    def _reserve(self, count: int):
+        """Make `count` rows free, growing the file first and evicting LRU entries after"""
+        while len(self._free) < count and self._rows < self.max_entries:
+            self._grow(self._dim)
+        evicted = []
+        while len(self._free) < count:
+            key, slot = self._entries.popitem(last=False)
+            self._free.append(slot)
+            evicted.append(key)
+        if evicted:
+            self.evictions += len(evicted)
+            # the index on disk still points at the evicted rows: log them before they are reused
+            with open(self._evicted_file, "ab") as f:
+                f.write(b"".join(evicted))
+            self._dirty = True
+
+    def lookup(self, model: str, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up many texts at once.
+
+        Returns a float32 (len(texts), dim) matrix and a boolean mask of the
+        rows that were found; rows for missing texts are zero.
+        """
+        keys = [self.key(model, text) for text in texts]
+        found = np.zeros(len(keys), dtype=bool)
+        slots = np.zeros(len(keys), dtype=np.int64)
+        with self._lock:
+            for row, key in enumerate(keys):
+                slot = self._entries.get(key)
+                if slot is None:
+                    continue
+                self._entries.move_to_end(key)
+                found[row] = True
+                slots[row] = slot
+            hits = int(found.sum())
+            self.hits += hits
+            if hits:
+                # recency changed; saved with the index on the next flush
+                self._dirty = True
+            self.misses += len(keys) - hits
+            if self._vectors is None:
+                return np.zeros((len(keys), 0), dtype=np.float32), found
+            # one fancy-indexed gather out of the memory map
+            matrix = np.asarray(self._vectors[slots])
+        matrix[~found] = 0.0
+        return matrix, found
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up many texts at once, None for each text not in the cache"""
+        matrix, found = self.lookup(model, texts)
+        return [row if ok else None for row, ok in zip(matrix, found)]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors):
+        """Store vectors (a 2-D array or a list of rows) for texts embedded with `model`"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) == 0:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._grow(vectors.shape[1])
+            if vectors.shape[1] != self._dim:
+                print(f"Embedding cache: skipping vectors of size {vectors.shape[1]}, cache holds {self._dim}")
+                return
+            # only the newest max_entries rows of an oversized batch could be kept anyway
+            rows = list(zip((self.key(model, text) for text in texts), vectors))[-self.max_entries:]
+            rows = list(dict(rows).items())
+            for key, _ in rows:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+            self._reserve(sum(1 for key, _ in rows if key not in self._entries))
+            for key, vector in rows:
+                slot = self._entries.get(key)
+                if slot is None:
+                    slot = self._free.pop()
+                self._entries[key] = slot
+                self._entries.move_to_end(key)
+                self._vectors[slot] = vector
+                self._dirty = True
+
+    def flush(self):
+        """Persist vectors and the LRU index to disk"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._dirty or self._vectors is None:
+            return
+        # vectors first, so the index never points at rows that are not on disk yet
+        self._vectors.flush()
+        index = np.fromiter(self._entries.items(), dtype=self._INDEX_DTYPE, count=len(self._entries))
+        tmp = self._index_file + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, index)
+        os.replace(tmp, self._index_file)
+        with open(self._meta_file, "w") as f:
+            json.dump({"dim": self._dim, "rows": self._rows}, f)
+        # the saved index no longer holds the logged keys
+        if os.path.exists(self._evicted_file):
+            os.remove(self._evicted_file)
+        self._dirty = False
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,207 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class _SessionIndex:
+    """
+    Postings of one session.
+
+    Chunks get consecutive integer ids. Re-indexing a chunk tombstones its
+    old id and appends a new one; tombstones are dropped when the session
+    is written to disk. Per-chunk lengths, liveness flags and every posting
+    list are `array`/`bytearray` buffers, so scoring views them as numpy
+    arrays without copying.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.lengths = array("i")
+        self.alive = bytearray()
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.dead = 0
+        self.dirty = False
+
+    def add(self, key: str, terms: List[str]):
+        old = self.ids.get(key)
+        if old is not None:
+            self.alive[old] = 0
+            self.dead += 1
+        doc = len(self.keys)
+        self.keys.append(key)
+        self.ids[key] = doc
+        self.lengths.append(len(terms))
+        self.alive.append(1)
+        for term, tf in Counter(terms).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array("i"), array("H"))
+            postings[0].append(doc)
+            postings[1].append(min(tf, 65535))
+        self.dirty = True
+
+    def remove(self, key: str):
+        old = self.ids.pop(key, None)
+        if old is not None:
+            self.alive[old] = 0
+            self.dead += 1
+            self.dirty = True
+
+    def save(self, path: str):
+        """Write the live chunks as one compressed CSR .npz file"""
+        alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+        remap = np.cumsum(alive, dtype=np.int64) - 1
+        terms, offsets, docs, tfs = [], [0], [], []
+        for term in sorted(self.postings):
+            doc_ids, freqs = (np.frombuffer(a, dtype=a.typecode) for a in self.postings[term])
+            live = alive[doc_ids]
+            if not live.any():
+                continue
+            terms.append(term)
+            docs.append(remap[doc_ids[live]].astype(np.int32))
+            tfs.append(freqs[live])
+            offsets.append(offsets[-1] + int(live.sum()))
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            keys=np.array([k for k, ok in zip(self.keys, alive) if ok], dtype=str),
+            lengths=np.frombuffer(self.lengths, dtype=np.int32)[alive],
+            terms=np.array(terms, dtype=str),
+            offsets=np.array(offsets, dtype=np.int64),
+            docs=np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32),
+            tfs=np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.uint16)
+        )
+        os.replace(tmp, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "_SessionIndex":
+        index = cls()
+        with np.load(path) as data:
+            index.keys = data["keys"].tolist()
+            index.ids = {key: doc for doc, key in enumerate(index.keys)}
+            index.lengths = array("i", data["lengths"].astype(np.int32).tobytes())
+            index.alive = bytearray(b"\x01" * len(index.keys))
+            offsets = data["offsets"]
+            docs = data["docs"].astype(np.int32)
+            tfs = data["tfs"].astype(np.uint16)
+            for n, term in enumerate(data["terms"].tolist()):
+                start, end = offsets[n], offsets[n + 1]
+                index.postings[term] = (array("i", docs[start:end].tobytes()), array("H", tfs[start:end].tobytes()))
+        return index
+
+
+class LexicalIndex:
+    """
+    Inverted BM25 index over chunk text, one postings file per session.
+
+    Chunks are added as they are stored (`add_many`), keyed by the same
+    string ids as their Qdrant points, so a search result can be resolved
+    to its payload. Sessions are loaded from `<path>/<session>.npz` on first
+    use and written back by `flush()`.
+    """
+
+    def __init__(self, path: str = "./lexical_index", k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._sessions: Dict[str, _SessionIndex] = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return _TOKEN.findall(text.lower())
+
+    def _session_file(self, session_id: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+        digest = hashlib.blake2b(session_id.encode("utf-8"), digest_size=4).hexdigest()
+        return os.path.join(self.path, f"{safe}_{digest}.npz")
+
+    def _session(self, session_id: str) -> _SessionIndex:
+        index = self._sessions.get(session_id)
+        if index is None:
+            try:
+                index = _SessionIndex.load(self._session_file(session_id))
+            except FileNotFoundError:
+                index = _SessionIndex()
+            except Exception as e:
+                print(f"Lexical index reset for session {session_id}: {e}")
+                index = _SessionIndex()
+            self._sessions[session_id] = index
+        return index
+
+    def add_many(self, session_id: str, keys: Sequence[str], texts: Sequence[str]):
+        """Index (or re-index) chunks of a session"""
+        tokenized = [self.tokenize(text) for text in texts]
+        with self._lock:
+            index = self._session(session_id)
+            for key, terms in zip(keys, tokenized):
+                index.add(key, terms)
+
+    def remove_many(self, session_id: str, keys: Sequence[str]):
+        """Drop chunks of a session from the index"""
+        with self._lock:
+            index = self._session(session_id)
+            for key in keys:
+                index.remove(key)
+
+    def search(self, session_id: str, terms: Sequence[str], limit: int = 5) -> List[Tuple[str, float]]:
+        """Best `limit` (chunk key, BM25 score) pairs of a session for the query terms"""
+        terms = list(dict.fromkeys(t for term in terms for t in self.tokenize(term)))
+        if not terms or limit <= 0:
+            return []
+        with self._lock:
+            index = self._session(session_id)
+            if not index.keys:
+                return []
+            alive = np.frombuffer(index.alive, dtype=np.uint8).astype(bool)
+            lengths = np.frombuffer(index.lengths, dtype=np.int32)
+            live = len(index.keys) - index.dead
+            avgdl = float(lengths[alive].mean()) if live else 1.0
+            scores = np.zeros(len(index.keys), dtype=np.float32)
+            for term in terms:
+                postings = index.postings.get(term)
+                if postings is None:
+                    continue
+                docs = np.frombuffer(postings[0], dtype=np.int32)
+                tfs = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+                keep = alive[docs]
+                docs, tfs = docs[keep], tfs[keep]
+                if len(docs) == 0:
+                    continue
+                idf = math.log(1.0 + (live - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[docs] / max(avgdl, 1e-9))
+                # a chunk appears once per posting list, so plain fancy-index adds are safe
+                scores[docs] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+            keys = index.keys
+
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(keys[doc], float(scores[doc])) for doc in hits]
+
+    def flush(self):
+        """Write sessions with new chunks to disk"""
+        with self._lock:
+            for session_id, index in self._sessions.items():
+                if index.dirty:
+                    index.save(self._session_file(session_id))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "chunks": sum(len(s.keys) - s.dead for s in self._sessions.values()),
+            "terms": sum(len(s.postings) for s in self._sessions.values()),
+        }
@@ -0,0 +1,167 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from crawler import AsyncCrawler, ParsedPage
+
+_DONE = None
+
+
+class PipelineStats:
+    """Counters for a streaming crawl-to-index run"""
+
+    def __init__(self):
+        self.pages = 0
+        self.documents = 0
+        self.chunks = 0
+        self.relations = 0
+        self.errors = 0
+        self.max_queued = 0
+        self.saved_fetches = 0
+        self.near_duplicates = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+class StreamingIndexer:
+    """
+    Streams crawled pages into GraphRAG while the crawl is still running.
+
+    crawl -> [pages] -> chunk -> [chunked] -> embed -> [embedded] -> write
+
+    Every arrow into a bracketed queue is a bounded asyncio.Queue, so when the
+    embedder falls behind the queues fill up and the crawler's on_page
+    callback blocks, which in turn stops the crawler fetching more pages.
+    Each stage runs its blocking work in a worker thread and handles pages
+    in order, so a page's parent is always written before its own edge. The
+    embed stage takes every page already waiting in its queue, up to
+    `embed_batch_size` chunks, and embeds them together.
+
+    With a CrawlStateStore passed as `state`, a page is committed to it only
+    after the write stage stored it, so pages that failed to embed or write
+    are crawled and indexed again on the next run.
+    """
+
+    def __init__(self, rag, session_id: str, queue_size: int = 32):
+        self.rag = rag
+        self.session_id = session_id
+        self.queue_size = max(1, queue_size)
+        self.stats = PipelineStats()
+        self.state = None
+
+    async def run(self, start_url: str, max_depth: int = 2, **crawler_options) -> PipelineStats:
+        """Crawl from `start_url` and index every fetched page"""
+        self.stats = PipelineStats()
+        self.state = crawler_options.get("state")
+        pages: asyncio.Queue = asyncio.Queue(self.queue_size)
+        chunked: asyncio.Queue = asyncio.Queue(self.queue_size)
+        embedded: asyncio.Queue = asyncio.Queue(self.queue_size)
+
+        async def on_page(url: str, page: ParsedPage, parent: Optional[str]):
+            self.stats.pages += 1
+            await pages.put({"url": url, "text": page.text, "title": page.title, "parent": parent})
+            self.stats.max_queued = max(
+                self.stats.max_queued, pages.qsize() + chunked.qsize() + embedded.qsize()
+            )
+
+        stages = [
+            asyncio.create_task(self._stage(pages, chunked, self._chunk)),
+            asyncio.create_task(self._embed_stage(chunked, embedded)),
+            asyncio.create_task(self._stage(embedded, None, self._write)),
+        ]
+        crawler = AsyncCrawler(max_depth=max_depth, **crawler_options)
+        try:
+            await crawler.crawl(start_url, on_page=on_page)
+            self.stats.saved_fetches = crawler.stats.saved_fetches
+            self.stats.near_duplicates = crawler.stats.near_duplicates
+            await pages.put(_DONE)
+            await asyncio.gather(*stages)
+            if self.state is not None:
+                self.state.flush()
+        finally:
+            for stage in stages:
+                stage.cancel()
+        return self.stats
+
+    async def _stage(self, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], work):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                if outbox is not None:
+                    await outbox.put(_DONE)
+                return
+            try:
+                item = await asyncio.to_thread(work, item)
+            except Exception as e:
+                print(f"Pipeline error for {item['url']}: {e}")
+                self.stats.errors += 1
+                continue
+            if outbox is not None:
+                await outbox.put(item)
+
+    async def _embed_stage(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        done = False
+        while not done:
+            items = [await inbox.get()]
+            if items[0] is _DONE:
+                break
+            pending = len(items[0]["chunks"])
+            while pending < self.rag.embed_batch_size and not inbox.empty():
+                item = inbox.get_nowait()
+                if item is _DONE:
+                    done = True
+                    break
+                items.append(item)
+                pending += len(item["chunks"])
+            try:
+                await asyncio.to_thread(self._embed, items)
+            except Exception as e:
+                print(f"Pipeline embedding error: {e}")
+                self.stats.errors += len(items)
+                continue
+            for item in items:
+                await outbox.put(item)
+        await outbox.put(_DONE)
+
+    def _chunk(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        item["chunks"] = self.rag.chunk_text(item.pop("text"))
+        return item
+
+    def _embed(self, items: List[Dict[str, Any]]):
+        for item in items:
+            item["pending"] = self.rag.pending_chunks(item["url"], item["chunks"], self.session_id)
+        vectors, ok = self.rag.embed_matrix([
+            item["chunks"][i] for item in items for i in item["pending"]
+        ])
+        offset = 0
+        for item in items:
+            rows = slice(offset, offset + len(item["pending"]))
+            item["vectors"], item["ok"] = vectors[rows], ok[rows]
+            offset += len(item["pending"])
+
+    def _write(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        url = item["url"]
+        self.rag.graph_db.insert_nodes([url], self.session_id)
+        chunks: List[str] = item["chunks"]
+        indexed = False
+        if chunks:
+            self.rag.trim_chunks({url: len(chunks)}, self.session_id)
+            stored = 0
+            if item["pending"]:
+                stored = self.rag.store_chunks(
+                    self.rag.doc_id_for(url), url, chunks, item["vectors"], self.session_id,
+                    indices=item["pending"], ok=item["ok"]
+                )
+            if stored or not item["pending"]:
+                self.stats.documents += 1
+                self.stats.chunks += stored
+                # a page with chunks that failed to embed must be fetched again
+                indexed = stored == len(item["pending"])
+        else:
+            print(f"Warning: No chunks generated for {url}")
+        if item["parent"] is not None:
+            self.rag.link_documents(item["parent"], url, self.session_id)
+            self.stats.relations += 1
+        if indexed and self.state is not None:
+            self.state.commit(url)
+        return item
@@ -1,5 +1,3 @@
-from db.QdrantDB import QdrantDB
-from db.KuzuDB import KuzuDB
 from rag import GraphRAG
 
 def initialize_system():
@@ -9,24 +7,9 @@ def initialize_system():
     print("=" * 50)
     
     try:
-        # Initialize vector DB
-        print("\n[1/3] Initializing Qdrant Vector DB...")
-        vector_db = QdrantDB(
-            path="./vector_db",
-            collection_name="nodes",
-            vector_size=768
-        )
-        info = vector_db.get_collection_info()
-        print(f"✓ Qdrant initialized: {info}")
-        
-        # Initialize graph DB
-        print("\n[2/3] Initializing KuzuDB Graph DB...")
-        graph_db = KuzuDB("./kuzu_db")
-        graph_db.test()
-        print("✓ KuzuDB initialized")
-        
-        # Initialize Graph-RAG
-        print("\n[3/3] Initializing Graph-RAG Pipeline...")
+        # Stores are opened lazily by GraphRAG and shared through the store
+        # registry, so each embedded database is opened exactly once
+        print("\n[1/3] Initializing Graph-RAG Pipeline...")
         rag = GraphRAG(
             embedding_model='nomic-embed-text:v1.5',
             language_model='llama3.2:3b',
@@ -36,6 +19,16 @@ def initialize_system():
         )
         print("✓ Graph-RAG pipeline initialized")
         
+        # Initialize vector DB
+        print("\n[2/3] Initializing Qdrant Vector DB...")
+        info = rag.vector_db.get_collection_info()
+        print(f"✓ Qdrant initialized: {info}")
+        
+        # Initialize graph DB
+        print("\n[3/3] Initializing KuzuDB Graph DB...")
+        rag.graph_db.test()
+        print("✓ KuzuDB initialized")
+        
         print("\n" + "=" * 50)
         print("System ready for operation!")
         print("=" * 50)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+
+import main
+
+
+class FakeRAG:
+    def open(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def __init__(self):
+        self.generating = 0
+        self.max_generating = 0
+        self.lock = threading.Lock()
+
+    def remember_answer(self, query, session_id, docs, answer, vector=None):
+        pass
+
+    def retrieve_for_answer(self, query, session_id):
+        time.sleep(0.01)
+        if query == "nothing":
+            return None, []
+        return None, [{"type": "vector_search", "url": f"http://{session_id}/a", "text": "alpha", "score": 1.0, "depth": 0}]
+
+    def aggregate_context(self, docs, session_id=None):
+        return "alpha"
+
+    def generate_response(self, query, context):
+        with self.lock:
+            self.generating += 1
+            self.max_generating = max(self.max_generating, self.generating)
+        time.sleep(0.05)
+        with self.lock:
+            self.generating -= 1
+        return f"answer to {query}"
+
+    def generate_stream(self, query, context):
+        yield from ["answer ", "to ", query]
+
+
+def test_query_runs_blocking_work_off_the_loop(monkeypatch):
+    rag = FakeRAG()
+    monkeypatch.setattr(main, "config", lambda: {"api-workers": 8, "llm-concurrency": 2})
+    monkeypatch.setattr(main, "build_rag", lambda settings: rag)
+
+    async def scenario():
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                responses = await asyncio.gather(*[
+                    client.post("/query", json={"session_id": f"s{i}", "query": f"q{i}"})
+                    for i in range(6)
+                ])
+                empty = await client.post("/query", json={"session_id": "s", "query": "nothing"})
+        return responses, empty
+
+    responses, empty = asyncio.run(scenario())
+    assert [r.json()["answer"] for r in responses] == [f"answer to q{i}" for i in range(6)]
+    assert responses[3].json()["sources"] == ["http://s3/a"]
+    assert empty.json()["sources"] == []
+    assert rag.max_generating == 2
+
+
+def test_query_streams_sources_before_tokens(monkeypatch):
+    monkeypatch.setattr(main, "config", lambda: {})
+    monkeypatch.setattr(main, "build_rag", lambda settings: FakeRAG())
+
+    async def scenario():
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                response = await client.post("/query", json={"session_id": "s", "query": "q", "stream": True})
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [e[0] for e in events] == ["event: sources", "event: token", "event: token", "event: token", "event: done"]
+    assert events[0][1] == 'data: ["http://s/a"]'
+    assert "".join(json.loads(e[1][len("data: "):]) for e in events[1:4]) == "answer to q"
+
+
+def test_query_embeds_the_question_once(monkeypatch, tmp_path):
+    import rag
+    from rag import GraphRAG
+
+    embedded = []
+
+    def fake_embed(model, input):
+        texts = [input] if isinstance(input, str) else input
+        embedded.extend(texts)
+        return {"embeddings": [[float(t.count("alpha")) + 0.01, float(t.count("beta")) + 0.01] for t in texts]}
+
+    monkeypatch.setattr(rag.ollama, "embed", fake_embed)
+    monkeypatch.setattr(rag.ollama, "chat", lambda model, messages: {"message": {"content": "A"}})
+    graph_rag = GraphRAG(
+        vector_size=2,
+        kuzu_db_path=str(tmp_path / "kuzu"),
+        qdrant_path=str(tmp_path / "qdrant"),
+        embedding_cache_path=None,
+        lexical_index_path=str(tmp_path / "lexical")
+    )
+    assert graph_rag.bulk_index_from_crawler([], {"http://s/a": "alpha alpha", "http://s/b": "beta beta"}, "s")
+    monkeypatch.setattr(main, "config", lambda: {})
+    monkeypatch.setattr(main, "build_rag", lambda settings: graph_rag)
+
+    async def scenario():
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                return [
+                    (await client.post("/query", json={"session_id": "s", "query": "alpha?", "stream": stream})).text
+                    for stream in (False, True)
+                ]
+
+    embedded.clear()
+    first, second = asyncio.run(scenario())
+    assert json.loads(first)["cached"] is False
+    assert '"cached": true' in second
+    # one embedding per request: cache lookup, retrieval and cache write share it
+    assert embedded == ["alpha?", "alpha?"]
+
+
+def test_failed_warmup_is_logged(monkeypatch, capsys):
+    class BrokenRAG(FakeRAG):
+        def open(self):
+            raise RuntimeError("qdrant locked")
+
+    monkeypatch.setattr(main, "config", lambda: {})
+    monkeypatch.setattr(main, "build_rag", lambda settings: BrokenRAG())
+
+    async def scenario():
+        async with main.app.router.lifespan_context(main.app):
+            await asyncio.wait([main.app.state.warmup])
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert "Warmup error: qdrant locked" in capsys.readouterr().out
@@ -0,0 +1,183 @@
+from benchmarks.sitegen import StaticSite, SyntheticSite
+from crawler import crawl_relations, parse_page
+
+
+def test_crawl_relations_shape():
+    with SyntheticSite(pages=50, links_per_page=3) as site:
+        root = site.url
+        link_text_map, relations = crawl_relations(root, max_depth=2, concurrency=4)
+
+    # 1 root + 3 children + 9 grandchildren
+    assert len(link_text_map) == 13
+    assert len(relations) == 12
+    assert "Page 0" in link_text_map[root]
+    assert "var x" not in link_text_map[root]
+    for parent, child in relations:
+        assert parent in link_text_map and child in link_text_map
+
+
+def test_crawl_relations_depth_zero():
+    with SyntheticSite(pages=10, links_per_page=3) as site:
+        root = site.url
+        link_text_map, relations = crawl_relations(root, max_depth=0)
+    assert list(link_text_map) == [root]
+    assert relations == []
+
+
+def test_crawl_relations_skips_broken():
+    with SyntheticSite(pages=10, links_per_page=3) as site:
+        link_text_map, relations = crawl_relations(site.url.replace("/page/0", "/page/99"))
+    assert link_text_map == {}
+    assert relations == []
+
+
+DIRECTORY_PAGES = {
+    "/docs/": "<html><body>docs index <a href='intro.html'>intro</a> <a href='guide/'>guide</a></body></html>",
+    "/docs/intro.html": "<html><body>introduction page</body></html>",
+    "/docs/guide/": "<html><body>guide index <a href='../intro.html?utm_source=x'>back</a></body></html>",
+}
+
+
+def test_crawl_resolves_relative_links_on_directory_pages():
+    with StaticSite(DIRECTORY_PAGES) as site:
+        link_text_map, relations = crawl_relations(site.url("/docs/"), max_depth=2, parse_workers=0)
+        root, intro, guide = site.url("/docs"), site.url("/docs/intro.html"), site.url("/docs/guide")
+        paths = list(site.paths)
+
+    # pages are reported under their canonical URL but fetched as linked
+    assert set(link_text_map) == {root, intro, guide}
+    assert "introduction page" in link_text_map[intro]
+    assert sorted(relations) == sorted([(root, intro), (root, guide)])
+    assert sorted(paths) == ["/docs/", "/docs/guide/", "/docs/intro.html"]
+
+
+def test_parse_page_single_pass():
+    html = (
+        "<html><head><title> Home </title><style>p {}</style></head>"
+        "<body><p>Hello world</p><a href='/a'>a</a><a href='mailto:x@y'>m</a>"
+        "<script>var x;</script></body></html>"
+    )
+    page = parse_page("http://example.com/", html)
+    assert page.title == "Home"
+    assert page.links == {"http://example.com/a"}
+    assert "Hello world" in page.text
+    assert "var x" not in page.text and "p {}" not in page.text
+
+
+def test_recrawl_skips_unchanged_pages(tmp_path):
+    from crawler import AsyncCrawler, CrawlStateStore
+    import asyncio
+
+    def indexed(state, pages):
+        # stands in for the consumer confirming every page it was handed
+        for url in pages:
+            state.commit(url)
+        state.flush()
+
+    path = str(tmp_path / "state.json")
+    with SyntheticSite(pages=50, links_per_page=3) as site:
+        root = site.url
+        state = CrawlStateStore(path)
+        first, _ = crawl_relations(root, max_depth=2, parse_workers=0, state=state)
+        assert len(first) == 13
+        indexed(state, first)
+
+        site.touch(4)
+        state = CrawlStateStore(path)
+        crawler = AsyncCrawler(max_depth=2, parse_workers=0, state=state)
+        changed, relations = asyncio.run(crawler.crawl(root))
+        assert site.not_modified == 12
+        indexed(state, changed)
+
+        # a server without validators falls back to comparing body hashes
+        site.validators = False
+        site.touch(5)
+        again, _ = crawl_relations(root, max_depth=2, parse_workers=0, state=CrawlStateStore(path))
+
+    assert list(changed) == [root.replace("/page/0", "/page/4")]
+    assert len(relations) == 12
+    assert crawler.stats.pages == 1 and crawler.stats.unchanged == 12
+    assert list(again) == [root.replace("/page/0", "/page/5")]
+
+
+def test_canonicalize_url():
+    from crawler import canonicalize_url
+    assert canonicalize_url("HTTP://Example.COM:80/a/b/?utm_source=x&b=2&a=1#frag") == "http://example.com/a/b?a=1&b=2"
+    assert canonicalize_url("https://example.com") == "https://example.com/"
+    assert canonicalize_url("https://example.com:8443/x/?fbclid=1") == "https://example.com:8443/x"
+    assert canonicalize_url("http://[::1]:8080/a/") == "http://[::1]:8080/a"
+    assert canonicalize_url("http://user@[FE80::1]:80/") == "http://user@[fe80::1]/"
+
+
+def test_crawl_folds_link_variants_and_near_duplicates():
+    from crawler import AsyncCrawler
+    import asyncio
+
+    with SyntheticSite(pages=50, links_per_page=3, link_variants=True) as site:
+        crawler = AsyncCrawler(max_depth=2, parse_workers=0)
+        link_text_map, relations = asyncio.run(crawler.crawl(site.url))
+        assert site.requests == 13
+    assert len(link_text_map) == 13 and len(relations) == 12
+    assert crawler.stats.saved_fetches == 12
+
+    # every page repeats one of two bodies under its own heading
+    with SyntheticSite(pages=50, links_per_page=3, distinct_bodies=2) as site:
+        crawler = AsyncCrawler(max_depth=2, parse_workers=0, dedup_distance=6)
+        link_text_map, relations = asyncio.run(crawler.crawl(site.url))
+    assert len(link_text_map) == 2
+    # pages 2, 3 and the children of page 1; links of duplicates are not followed
+    assert crawler.stats.near_duplicates == 5
+    for parent, child in relations:
+        assert parent in link_text_map and child in link_text_map
+
+
+def test_scheduler_multi_seed_sessions_robots_and_budgets():
+    from crawler import CrawlBudget, CrawlScheduler
+    import asyncio
+
+    with SyntheticSite(pages=50, links_per_page=3, robots="User-agent: *\nDisallow: /page/2\n") as a, \
+            SyntheticSite(pages=50, links_per_page=3) as b, \
+            SyntheticSite(pages=500, links_per_page=10) as big:
+        # every SyntheticSite serves the same bodies, so keep them apart from dedup
+        scheduler = CrawlScheduler(concurrency=4, min_delay=0.0, parse_workers=0, dedup_distance=None)
+        scheduler.add("two-sites", [a.url, b.url], max_depth=1)
+        scheduler.add("huge", [big.url], max_depth=3, budget=CrawlBudget(max_pages=8))
+        results = asyncio.run(scheduler.run())
+        blocked = a.url.replace("/page/0", "/page/2")
+
+    link_text_map, relations = results["two-sites"]
+    # both roots and their children, minus /page/2 on the first site
+    assert len(link_text_map) == 7 and len(relations) == 5
+    assert blocked not in link_text_map
+    assert scheduler.jobs["two-sites"].stats.robots_blocked == 1
+    assert scheduler.jobs["two-sites"].exhausted is None
+
+    huge = scheduler.jobs["huge"]
+    assert huge.stats.pages == 8 and len(results["huge"][0]) == 8
+    assert huge.exhausted == "pages"
+
+
+def test_scheduler_honours_crawl_delay():
+    from crawler import crawl_sessions
+
+    with SyntheticSite(pages=20, links_per_page=2, robots="User-agent: *\nCrawl-delay: 1\n") as site:
+        results = crawl_sessions({"s": [site.url]}, max_depth=1, min_delay=0.0, per_host_concurrency=4, parse_workers=0)
+        times = [t for t, path in site.request_times if path != "/robots.txt"]
+
+    assert len(results["s"][0]) == 3
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= 0.95
+
+
+def test_scheduler_resolves_relative_links_on_directory_pages():
+    from crawler import crawl_sessions
+
+    with StaticSite(DIRECTORY_PAGES) as site:
+        results = crawl_sessions({"docs": [site.url("/docs/")]}, max_depth=2, min_delay=0.0, parse_workers=0)
+        root, intro, guide = site.url("/docs"), site.url("/docs/intro.html"), site.url("/docs/guide")
+        paths = [path for path in site.paths if path != "/robots.txt"]
+
+    link_text_map, relations = results["docs"]
+    assert set(link_text_map) == {root, intro, guide}
+    assert sorted(relations) == sorted([(root, intro), (root, guide)])
+    assert sorted(paths) == ["/docs/", "/docs/guide/", "/docs/intro.html"]
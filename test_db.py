@@ -0,0 +1,175 @@
+from db.KuzuDB import KuzuDB
+
+
+def test_kuzu_bulk_insert_is_idempotent(tmp_path):
+    db = KuzuDB(str(tmp_path / "kuzu"))
+    assert db.insert_nodes(["a", "b", "c", "a"], "s1") == 3
+    db.insert_nodes(["a", "d"], "s1")
+    db.insert_rels([("a", "b"), ("b", "c"), ("a", "b")], "s1")
+    db.insert_rels([("a", "b"), ("a", "missing")], "s1")
+
+    assert sorted(db.get_session_nodes("s1")) == ["a", "b", "c", "d"]
+    assert db.show("MATCH ()-[r:hyprlink]->() RETURN count(r)") == [[2]]
+    assert sorted(db.get_neighbors("a", "s1", depth=2)) == ["b", "c"]
+
+
+def test_kuzu_concurrent_bulk_inserts_all_land(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    db = KuzuDB(str(tmp_path / "kuzu"))
+    reader = KuzuDB(str(tmp_path / "kuzu"))
+
+    def write(worker):
+        for batch in range(30):
+            assert db.insert_nodes([f"w{worker}-{batch}-{i}" for i in range(50)], "s1") == 50
+            reader.get_session_nodes("s1")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(write, range(3)))
+    assert len(db.get_session_nodes("s1")) == 3 * 30 * 50
+
+
+def test_kuzu_parameters_handle_quotes(tmp_path):
+    db = KuzuDB(str(tmp_path / "kuzu"))
+    db.insert_node("http://x/it's", "s'1")
+    db.insert_node("http://x/a\\b", "s'1")
+    db.insert_rel("http://x/it's", "http://x/a\\b", "s'1")
+
+    assert db.get_neighbors("http://x/it's", "s'1") == ["http://x/a\\b"]
+    assert sorted(db.get_session_nodes("s'1")) == ["http://x/a\\b", "http://x/it's"]
+    report = db.latency_report()
+    assert report["insert_node"]["count"] == 2
+    assert report["get_neighbors_1"]["count"] == 1
+
+
+def test_kuzu_neighborhoods_min_hops(tmp_path):
+    db = KuzuDB(str(tmp_path / "kuzu"))
+    db.insert_nodes(["a", "b", "c", "d", "e"], "s1")
+    db.insert_rels([("a", "b"), ("b", "c"), ("a", "c"), ("c", "d"), ("d", "a"), ("e", "d")], "s1")
+
+    hoods = db.get_neighborhoods(["a", "e", "a"], "s1", depth=2)
+    assert hoods == {
+        "a": {"b": 1, "c": 1, "d": 2},
+        "e": {"d": 1, "a": 2},
+    }
+    assert db.get_neighborhoods([], "s1", depth=2) == {}
+    assert db.get_neighborhoods(["a"], "other", depth=2) == {"a": {}}
+
+
+def test_session_graph_cache_matches_kuzu_and_invalidates(tmp_path):
+    from db.SessionGraphCache import SessionGraphCache
+
+    db = KuzuDB(str(tmp_path / "kuzu"))
+    db.insert_nodes(["a", "b", "c", "d", "e"], "s1")
+    db.insert_rels([("a", "b"), ("b", "c"), ("a", "c"), ("c", "d"), ("d", "a"), ("e", "d")], "s1")
+    cache = SessionGraphCache(db)
+
+    assert cache.get_neighborhoods(["a", "e"], "s1", 2) == db.get_neighborhoods(["a", "e"], "s1", 2)
+    cache.get_neighborhoods(["a"], "s1", 2)
+    assert cache.stats()["hits"] == 1
+
+    db.insert_rels([("b", "e")], "s1")
+    assert cache.get_neighborhoods(["b"], "s1", 1) == {"b": {"c": 1, "e": 1}}
+    assert cache.stats()["misses"] == 2
+
+
+def test_session_graph_cache_lru_bound(tmp_path):
+    from db.SessionGraphCache import SessionGraph, SessionGraphCache
+
+    db = KuzuDB(str(tmp_path / "kuzu"))
+    for session in ["s1", "s2", "s3"]:
+        links = [f"{session}/{i}" for i in range(20)]
+        db.insert_nodes(links, session)
+        db.insert_rels(list(zip(links, links[1:])), session)
+    one = SessionGraph(db.get_session_edges("s1")).nbytes
+    cache = SessionGraphCache(db, max_bytes=2 * one)
+
+    for session in ["s1", "s2", "s3"]:
+        cache.get(session)
+    assert cache.stats()["sessions"] == 2
+    assert cache.stats()["bytes"] <= 2 * one
+
+
+def _qdrant_points(sessions, per_session):
+    ids, vectors, payloads = [], [], []
+    for s, session in enumerate(sessions):
+        for i in range(per_session):
+            ids.append(f"{session}_{i}")
+            vectors.append([1.0, float(i), float(s), 0.5])
+            payloads.append({"session_id": session, "url": f"http://{session}/{i}", "doc_id": session})
+    return ids, vectors, payloads
+
+
+def test_qdrant_query_is_session_scoped(tmp_path):
+    from db.QdrantDB import QdrantDB
+
+    for partitioned in (False, True):
+        db = QdrantDB(path=str(tmp_path / f"q{partitioned}"), vector_size=4, partition_by_session=partitioned)
+        db.upsert_points(*_qdrant_points(["a", "b/c"], 5))
+
+        hits = db.query([1.0, 1.0, 1.0, 0.5], limit=10, session_id="b/c")
+        assert len(hits) == 5
+        assert {h.payload["session_id"] for h in hits} == {"b/c"}
+        assert len(db.query([1.0, 1.0, 1.0, 0.5], limit=10, session_id="missing")) == 0
+        if not partitioned:
+            assert len(db.query([1.0, 1.0, 1.0, 0.5], limit=10)) == 10
+        db.clear_collection()
+        assert len(db.query([1.0, 1.0, 1.0, 0.5], limit=10, session_id="a")) == 0
+
+
+def test_stores_are_opened_once_per_path(tmp_path):
+    from db.QdrantDB import QdrantDB
+
+    first = QdrantDB(path=str(tmp_path / "q"), vector_size=4)
+    second = QdrantDB(path=str(tmp_path / "q" / "."), vector_size=4)
+    assert first.client is second.client
+    first.upsert_points(*_qdrant_points(["a"], 3))
+    assert len(second.query([1.0, 1.0, 0.0, 0.5], limit=10, session_id="a")) == 3
+
+    kuzu_a = KuzuDB(str(tmp_path / "kuzu"))
+    kuzu_b = KuzuDB(str(tmp_path / "kuzu"))
+    assert kuzu_a.db is kuzu_b.db
+    assert kuzu_a._session_versions is kuzu_b._session_versions
+
+    # the registry does not keep stores open once no wrapper uses them
+    import gc
+    import weakref
+    database = weakref.ref(kuzu_a.db)
+    del kuzu_a, kuzu_b
+    gc.collect()
+    assert database() is None
+
+
+def test_import_rag_defers_heavy_clients():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, rag\n"
+        "heavy = ['qdrant_client', 'kuzu', 'semchunk']\n"
+        "print([m for m in heavy if m in sys.modules])\n"
+        "print(type(sys.modules['ollama']).__name__)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split("\n")
+    assert out[0] == "[]"
+    # ollama is registered but not executed until first use
+    assert out[1] == "_LazyModule"
+
+
+def test_qdrant_indexes_existing_collections(tmp_path):
+    from qdrant_client.http.models import Distance, VectorParams
+    from db.QdrantDB import QdrantDB
+
+    path = str(tmp_path / "q")
+    db = QdrantDB(path=path, vector_size=4)
+    # a collection created before the payload indexes existed
+    db.client.create_collection("legacy", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+
+    indexed = []
+    original = db.client.create_payload_index
+    db.client.create_payload_index = lambda **kwargs: indexed.append(kwargs["field_name"]) or original(**kwargs)
+    try:
+        QdrantDB(path=path, collection_name="legacy", vector_size=4)
+    finally:
+        del db.client.create_payload_index
+    assert sorted(indexed) == ["chunk_idx", "doc_id", "session_id", "url"]
@@ -21,3 +21,13 @@ def run_tests():
 
 if __name__ == "__main__":
     run_tests()
+
+
+def test_transform_without_nltk_data():
+    bridge = QueryBridge()
+    assert bridge.transform("How do solar panels generate electricity?") == "solar panels generate electricity"
+    assert bridge.transform("Tell me about quantum-computing!") == "tell quantum computing"
+    # nothing but stopwords: the query is passed through unchanged
+    assert bridge.transform("What is it?") == "What is it?"
+    assert bridge.transform_many(["Why is the sky blue?", "AI", ""]) == ["sky blue", "ai", ""]
+    assert bridge.transform("one two three four five six seven eight nine") == "one two three four five six seven"
@@ -0,0 +1,528 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from benchmarks.sitegen import SyntheticSite
+from rag import GraphRAG
+from rag.embedding_cache import EmbeddingCache
+from rag.pipeline import StreamingIndexer
+
+
+class FakeGraph:
+    def __init__(self):
+        self.nodes = []
+
+    def insert_nodes(self, links, session_id):
+        self.nodes.extend(links)
+        return len(links)
+
+
+class FakeRAG:
+    doc_id_for = staticmethod(GraphRAG.doc_id_for)
+
+    def __init__(self, embed_delay=0.0, embed_ok=True):
+        self.embed_batch_size = 8
+        self.embed_ok = embed_ok
+        self.embed_calls = 0
+        self.graph_db = FakeGraph()
+        self.embed_delay = embed_delay
+        self.stored = {}
+        self.edges = []
+
+    def chunk_text(self, text):
+        return [text[i:i + 100] for i in range(0, len(text), 100)]
+
+    def pending_chunks(self, url, chunks, session_id):
+        return list(range(len(chunks)))
+
+    def trim_chunks(self, chunk_counts, session_id):
+        return 0
+
+    def embed_matrix(self, texts):
+        self.embed_calls += 1
+        time.sleep(self.embed_delay)
+        return np.ones((len(texts), 2), dtype=np.float32), np.full(len(texts), self.embed_ok)
+
+    def store_chunks(self, doc_id, url, chunks, vectors, session_id, indices=None, ok=None):
+        assert len(vectors) == len(chunks)
+        stored = int(np.sum(ok)) if ok is not None else len(chunks)
+        if stored:
+            self.stored[url] = stored
+        return stored
+
+    def link_documents(self, from_url, to_url, session_id):
+        assert from_url in self.graph_db.nodes
+        self.edges.append((from_url, to_url))
+
+
+def test_streaming_indexer_writes_parents_first():
+    rag = FakeRAG()
+    with SyntheticSite(pages=50, links_per_page=3, words=50) as site:
+        stats = asyncio.run(StreamingIndexer(rag, "s1", queue_size=2).run(site.url, max_depth=2, parse_workers=0))
+    assert stats.documents == 13
+    assert stats.relations == 12
+    assert len(rag.edges) == 12
+    assert len(rag.stored) == 13
+
+
+def test_streaming_indexer_commits_crawl_state_after_indexing(tmp_path):
+    from crawler import CrawlStateStore
+
+    path = str(tmp_path / "state.json")
+    with SyntheticSite(pages=50, links_per_page=3, words=50) as site:
+        failing = FakeRAG(embed_ok=False)
+        stats = asyncio.run(StreamingIndexer(failing, "s1").run(
+            site.url, max_depth=2, parse_workers=0, state=CrawlStateStore(path)
+        ))
+        assert stats.documents == 0 and failing.stored == {}
+
+        # nothing was indexed, so nothing may be skipped as unchanged
+        rag = FakeRAG()
+        state = CrawlStateStore(path)
+        assert len(state) == 0
+        stats = asyncio.run(StreamingIndexer(rag, "s1").run(site.url, max_depth=2, parse_workers=0, state=state))
+        assert stats.documents == 13 and len(rag.stored) == 13
+        assert len(CrawlStateStore(path)) == 13
+
+
+def test_streaming_indexer_backpressure():
+    rag = FakeRAG(embed_delay=0.001)
+    with SyntheticSite(pages=200, links_per_page=6, words=50) as site:
+        stats = asyncio.run(StreamingIndexer(rag, "s1", queue_size=2).run(site.url, max_depth=2, parse_workers=0))
+    assert stats.documents == 43
+    # three bounded queues of size 2
+    assert stats.max_queued <= 6
+
+
+def test_embed_texts_batches_and_retries_failures(monkeypatch):
+    calls = []
+
+    def fake_embed(model, input):
+        calls.append(input)
+        if isinstance(input, list):
+            if "bad" in input:
+                raise RuntimeError("batch failed")
+            return {"embeddings": [[float(len(t))] for t in input]}
+        if input == "bad":
+            raise RuntimeError("bad input")
+        return {"embeddings": [[float(len(input))]]}
+
+    import rag
+    monkeypatch.setattr(rag.ollama, "embed", fake_embed)
+    graph_rag = GraphRAG.__new__(GraphRAG)
+    graph_rag.embedding_model = "stub"
+    graph_rag.embed_batch_size = 2
+    graph_rag.embedding_cache = None
+    graph_rag.vector_size = 1
+
+    vectors = graph_rag.embed_texts(["a", "bb", "bad", "cccc", "d"])
+    assert vectors == [[1.0], [2.0], None, [4.0], [1.0]]
+    # two good batches, one failed batch and its two single retries
+    assert calls == [["a", "bb"], ["bad", "cccc"], "bad", "cccc", ["d"]]
+
+
+def test_embedding_cache_roundtrip_and_lru(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get_many("m", ["a"])[0].tolist() == [1.0, 2.0]
+    assert cache.get_many("other-model", ["a"]) == [None]
+
+    # "b" is now least recently used and gets evicted
+    cache.put_many("m", ["c"], [[5.0, 6.0]])
+    found = cache.get_many("m", ["a", "b", "c"])
+    assert found[1] is None
+    assert found[0].dtype == "float32" and found[2].tolist() == [5.0, 6.0]
+    assert cache.stats()["evictions"] == 1
+    cache.flush()
+
+    reopened = EmbeddingCache(str(tmp_path), max_entries=2)
+    assert len(reopened) == 2
+    assert reopened.get_many("m", ["c"])[0].tolist() == [5.0, 6.0]
+    assert reopened.stats()["hits"] == 1
+
+
+def test_embedding_cache_never_maps_evicted_keys_to_new_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many("m", ["a", "b"], [[1.0, 1.0], [2.0, 2.0]])
+    cache.flush()
+    # evicts "a" and reuses its row; the process "crashes" before flush()
+    cache.put_many("m", ["c"], [[3.0, 3.0]])
+    cache._vectors.flush()
+
+    reopened = EmbeddingCache(str(tmp_path), max_entries=2)
+    a, b, c = reopened.get_many("m", ["a", "b", "c"])
+    assert a is None and c is None
+    assert b.tolist() == [2.0, 2.0]
+
+
+def test_embedding_cache_evictions_do_not_rewrite_the_index(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many("m", ["a", "b"], [[1.0, 1.0], [2.0, 2.0]])
+    cache.flush()
+    saved = os.path.getmtime(cache._index_file), os.path.getsize(cache._index_file)
+    time.sleep(0.01)
+    for i in range(5):
+        cache.put_many("m", [f"x{i}"], [[float(i), 0.0]])
+    assert (os.path.getmtime(cache._index_file), os.path.getsize(cache._index_file)) == saved
+    assert cache.stats()["evictions"] == 5
+
+    # lookups alone change the LRU order, and flush() saves it
+    cache.get_many("m", ["x3"])
+    cache.flush()
+    reopened = EmbeddingCache(str(tmp_path), max_entries=2)
+    reopened.put_many("m", ["y"], [[9.0, 9.0]])
+    x3, x4 = reopened.get_many("m", ["x3", "x4"])
+    assert x3.tolist() == [3.0, 0.0] and x4 is None
+
+
+def test_embed_texts_uses_cache(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_embed(model, input):
+        calls.append(list(input))
+        return {"embeddings": [[float(len(t)), 1.0] for t in input]}
+
+    import rag
+    monkeypatch.setattr(rag.ollama, "embed", fake_embed)
+    graph_rag = GraphRAG.__new__(GraphRAG)
+    graph_rag.embedding_model = "stub"
+    graph_rag.embed_batch_size = 8
+    graph_rag.embedding_cache = EmbeddingCache(str(tmp_path))
+    graph_rag.lexical_index = None
+    graph_rag.vector_size = 2
+
+    assert graph_rag.embed_texts(["a", "bb"]) == [[1.0, 1.0], [2.0, 1.0]]
+    assert graph_rag.embed_texts(["bb", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert calls == [["a", "bb"], ["ccc"]]
+    # new vectors stay in memory until GraphRAG.flush()
+    assert not os.path.exists(tmp_path / "index.npy")
+    graph_rag.flush()
+    assert len(EmbeddingCache(str(tmp_path))) == 3
+
+
+def test_fallback_chunks_are_slices_within_size():
+    from rag.chunking import chunk_offsets, fallback_chunks
+
+    text = " ".join(f"word{i}" for i in range(500))
+    chunks = fallback_chunks(text, 64)
+    assert all(len(c) <= 64 for c in chunks)
+    assert " ".join(chunks) == text
+
+    spans = chunk_offsets(text, 64, overlap=16)
+    assert all(text[s:e] in text for s, e in spans)
+    # overlapping spans start before the previous one ends and still make progress
+    for (s1, e1), (s2, e2) in zip(spans, spans[1:]):
+        assert s1 < s2 < e1
+    assert spans[-1][1] == len(text)
+
+    assert fallback_chunks("   ", 64) == []
+    assert fallback_chunks("x" * 100, 10) == ["x" * 100]
+
+
+def test_related_docs_score_cached_neighborhoods_by_depth(tmp_path):
+    from db.KuzuDB import KuzuDB
+    from db.SessionGraphCache import SessionGraphCache
+
+    graph_rag = GraphRAG.__new__(GraphRAG)
+    graph_rag.graph_db = KuzuDB(str(tmp_path / "kuzu"))
+    graph_rag.session_graphs = SessionGraphCache(graph_rag.graph_db)
+    graph_rag.max_graph_depth = 2
+    graph_rag.graph_db.insert_nodes(["a", "b", "c", "d", "x"], "s1")
+    graph_rag.graph_db.insert_rels([("a", "b"), ("b", "c"), ("c", "d"), ("x", "c")], "s1")
+
+    related = graph_rag._related_docs(["a", "x"], graph_rag._neighborhoods(["a", "x"], "s1"))
+    assert [(d["url"], d["depth"], d["score"]) for d in related] == [
+        ("b", 1, 0.5), ("c", 1, 0.5), ("d", 2, 0.25)
+    ]
+    assert all(d["type"] == "graph_traversal" for d in related)
+
+
+def _stub_embed(model, input):
+    texts = [input] if isinstance(input, str) else input
+    # tiny deterministic "embedding": counts of a few marker words
+    markers = ["alpha", "beta", "gamma", "delta"]
+    return {"embeddings": [[float(t.count(m)) + 0.01 for m in markers] for t in texts]}
+
+
+def _small_rag(tmp_path, monkeypatch):
+    import rag
+    monkeypatch.setattr(rag.ollama, "embed", _stub_embed)
+    graph_rag = GraphRAG(
+        vector_size=4,
+        kuzu_db_path=str(tmp_path / "kuzu"),
+        qdrant_path=str(tmp_path / "qdrant"),
+        embedding_cache_path=None,
+        lexical_index_path=str(tmp_path / "lexical")
+    )
+    documents = {
+        "http://s/a": "alpha alpha alpha",
+        "http://s/b": "beta beta beta",
+        "http://s/c": "gamma gamma gamma",
+        "http://s/d": "delta delta delta",
+    }
+    relations = [("http://s/a", "http://s/c"), ("http://s/b", "http://s/d"), ("http://s/c", "http://s/d")]
+    assert graph_rag.bulk_index_from_crawler(relations, documents, "s1")
+    return graph_rag
+
+
+def test_retrieve_many_matches_single_retrieval(tmp_path, monkeypatch):
+    graph_rag = _small_rag(tmp_path, monkeypatch)
+    queries = ["alpha", "beta"]
+
+    batched = graph_rag.retrieve_many(queries, "s1", top_k=1)
+    single = [graph_rag.retrieve_with_graph_traversal(q, "s1", top_k=1) for q in queries]
+    assert batched == single
+    assert batched[0][0]["url"] == "http://s/a"
+    assert [(d["url"], d["depth"]) for d in batched[0][1:]] == [("http://s/c", 1), ("http://s/d", 2)]
+    assert [(d["url"], d["depth"]) for d in batched[1][1:]] == [("http://s/d", 1)]
+    assert graph_rag.retrieve_many(queries, "other-session", top_k=1) == [[], []]
+
+
+def test_reindex_is_idempotent_and_skips_unchanged(tmp_path, monkeypatch):
+    graph_rag = _small_rag(tmp_path, monkeypatch)
+    count = graph_rag.vector_db.client.count(graph_rag.vector_db.collection).count
+    assert count == 4
+
+    embedded = []
+
+    def fake_matrix(texts):
+        embedded.extend(texts)
+        return np.tile(np.float32([1.0, 0.0, 0.0, 0.0]), (len(texts), 1)), np.ones(len(texts), dtype=bool)
+
+    monkeypatch.setattr(graph_rag, "embed_matrix", fake_matrix)
+    documents = {
+        "http://s/a": "alpha alpha alpha",
+        "http://s/b": "beta beta beta changed",
+        "http://s/c": "gamma gamma gamma",
+        "http://s/d": "delta delta delta",
+    }
+    assert graph_rag.bulk_index_from_crawler([], documents, "s1")
+    assert embedded == ["beta beta beta changed"]
+    assert graph_rag.vector_db.client.count(graph_rag.vector_db.collection).count == 4
+
+    # another session gets its own points for the same URLs
+    graph_rag.bulk_index_from_crawler([], {"http://s/a": "alpha alpha alpha"}, "s2")
+    assert graph_rag.vector_db.client.count(graph_rag.vector_db.collection).count == 5
+
+
+def test_bulk_index_commits_crawl_state_only_for_indexed_pages(tmp_path, monkeypatch):
+    import rag
+    from crawler import CrawlStateStore, crawl_relations
+
+    monkeypatch.setattr(rag.ollama, "embed", _stub_embed)
+    graph_rag = GraphRAG(
+        vector_size=4,
+        kuzu_db_path=str(tmp_path / "kuzu"),
+        qdrant_path=str(tmp_path / "qdrant"),
+        embedding_cache_path=None,
+        lexical_index_path=None
+    )
+    path = str(tmp_path / "state.json")
+    with SyntheticSite(pages=20, links_per_page=3, words=50) as site:
+        state = CrawlStateStore(path)
+        documents, relations = crawl_relations(site.url, max_depth=1, parse_workers=0, state=state)
+        assert len(documents) == 4
+        broken = sorted(documents)[1]
+        store_chunks = graph_rag.store_chunks
+
+        def failing_store(doc_id, url, *args, **kwargs):
+            if url == broken:
+                raise RuntimeError("qdrant unavailable")
+            return store_chunks(doc_id, url, *args, **kwargs)
+
+        monkeypatch.setattr(graph_rag, "store_chunks", failing_store)
+        assert graph_rag.bulk_index_from_crawler(relations, documents, "s1", state=state)
+
+        # the page that failed to store is fetched in full again, the rest are unchanged
+        again, _ = crawl_relations(site.url, max_depth=1, parse_workers=0, state=CrawlStateStore(path))
+    assert list(again) == [broken]
+
+
+def test_reindexing_a_shorter_page_drops_its_old_chunks(tmp_path, monkeypatch):
+    graph_rag = _small_rag(tmp_path, monkeypatch)
+    monkeypatch.setattr(graph_rag, "chunk_texts", lambda texts: [text.split("|") for text in texts])
+    url = "http://s/long"
+
+    graph_rag.bulk_index_from_crawler([], {url: "alpha one|beta two|gamma three|delta four"}, "s1")
+    graph_rag.bulk_index_from_crawler([], {url: "alpha one"}, "s1")
+
+    stored = graph_rag.vector_db.leading_chunks([url], "s1", per_url=10)[url]
+    assert [p["chunk_idx"] for p in stored] == [0]
+    assert graph_rag.lexical_index.search("s1", ["four"]) == []
+    assert graph_rag.lexical_index.search("s1", ["one"])[0][0] == graph_rag.chunk_key("s1", url, 0)
+    # other pages and sessions keep their chunks
+    assert graph_rag.vector_db.client.count(graph_rag.vector_db.collection).count == 5
+
+
+def test_generate_stream_yields_tokens(monkeypatch):
+    import rag
+    seen = {}
+
+    def fake_chat(model, messages, stream=False):
+        seen["stream"] = stream
+        return iter([{"message": {"content": t}} for t in ["Hel", "", "lo"]])
+
+    monkeypatch.setattr(rag.ollama, "chat", fake_chat)
+    graph_rag = GraphRAG.__new__(GraphRAG)
+    graph_rag.language_model = "stub"
+    assert list(graph_rag.generate_stream("q", "ctx")) == ["Hel", "lo"]
+    assert seen["stream"] is True
+
+
+def test_semantic_answer_cache_hits_and_invalidates(tmp_path, monkeypatch):
+    import rag
+    graph_rag = _small_rag(tmp_path, monkeypatch)
+    calls = []
+    monkeypatch.setattr(rag.ollama, "chat", lambda model, messages: calls.append(messages) or {"message": {"content": "A"}})
+
+    assert graph_rag.answer("alpha alpha", "s1") == "A"
+    # same embedding, so the answer comes from the cache
+    assert graph_rag.answer("alpha alpha", "s1") == "A"
+    assert len(calls) == 1
+    assert graph_rag.cached_answer("alpha alpha", "s1").sources[0] == "http://s/a"
+    assert graph_rag.cached_answer("alpha alpha", "s2") is None
+
+    graph_rag.link_documents("http://s/a", "http://s/b", "s1")
+    assert graph_rag.answer("alpha alpha", "s1") == "A"
+    assert len(calls) == 2
+    stats = graph_rag.answer_cache.stats()
+    assert stats["hits"] == 2 and stats["invalidations"] == 1
+
+
+def test_answer_cache_threshold_ttl_and_lru():
+    from rag.answer_cache import SemanticAnswerCache
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=2, ttl=60.0)
+    docs = [{"url": "u"}]
+    cache.store("s", [1.0, 0.0], "x", docs)
+    cache.store("s", [0.0, 1.0], "y", docs)
+    assert cache.lookup("s", [0.99, 0.05]).answer == "x"
+    assert cache.lookup("s", [0.7, 0.7]) is None
+
+    # "y" is least recently used and makes room for "z"
+    cache.store("s", [-1.0, 0.0], "z", docs)
+    assert cache.lookup("s", [0.0, 1.0]) is None
+    assert cache.lookup("s", [-1.0, 0.0]).answer == "z"
+
+    cache.ttl = 0.0
+    assert cache.lookup("s", [1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_build_context_budget_dedup_and_merge():
+    from rag.context import build_context, estimate_tokens
+    docs = [
+        {"type": "vector_search", "url": "u1", "text": "one two three", "score": 0.9, "depth": 0, "chunk_idx": 1},
+        {"type": "vector_search", "url": "u2", "text": "four five six", "score": 0.8, "depth": 0, "chunk_idx": 0},
+        {"type": "vector_search", "url": "u1", "text": "seven eight", "score": 0.7, "depth": 0, "chunk_idx": 2},
+        {"type": "vector_search", "url": "u3", "text": "one two three", "score": 0.6, "depth": 0, "chunk_idx": 0},
+        {"type": "graph_traversal", "url": "u4", "text": "", "score": 0.5, "depth": 1},
+        {"type": "graph_traversal", "url": "u5", "text": "x " * 400, "score": 0.5, "depth": 1},
+    ]
+    context = build_context(docs, budget_tokens=40)
+    assert context == "[vector_search] u1:\none two three seven eight\n\n[vector_search] u2:\nfour five six"
+    assert estimate_tokens(context) <= 40
+    assert build_context([], budget_tokens=40) == "No context found."
+
+
+def test_aggregate_context_fetches_graph_chunk_text(tmp_path, monkeypatch):
+    graph_rag = _small_rag(tmp_path, monkeypatch)
+    docs = graph_rag.retrieve_with_graph_traversal("alpha", "s1", top_k=1)
+    context = graph_rag.aggregate_context(docs, "s1")
+    assert "Related document from knowledge graph" not in context
+    assert "gamma gamma gamma" in context and "delta delta delta" in context
+    # without a session the placeholders are simply dropped
+    assert "gamma" not in graph_rag.aggregate_context(docs)
+
+
+def test_lexical_index_bm25_reindex_and_reload(tmp_path):
+    from rag.lexical_index import LexicalIndex
+    index = LexicalIndex(str(tmp_path))
+    index.add_many("s1", ["a", "b", "c"], ["solar panels and wind", "solar solar power", "quantum computing"])
+    index.add_many("s2", ["x"], ["solar farm"])
+    assert [key for key, _ in index.search("s1", ["solar"])] == ["b", "a"]
+    assert index.search("s1", ["missing"]) == []
+
+    # re-indexing a chunk replaces its old postings
+    index.add_many("s1", ["b"], ["quantum power"])
+    assert [key for key, _ in index.search("s1", ["solar"])] == ["a"]
+    index.flush()
+
+    reopened = LexicalIndex(str(tmp_path))
+    assert [key for key, _ in reopened.search("s1", ["quantum"], limit=1)] == ["c"]
+    assert [key for key, _ in reopened.search("s2", ["Solar"])] == ["x"]
+    assert reopened.stats()["chunks"] == 4
+
+
+def test_hybrid_retrieval_finds_keyword_only_matches(tmp_path, monkeypatch):
+    graph_rag = _small_rag(tmp_path, monkeypatch)
+    graph_rag.bulk_index_from_crawler([], {"http://s/e": "alpha alpha alpha alpha zeta"}, "s1")
+    # the stub embedding has no notion of "zeta", only BM25 does
+    docs = graph_rag.retrieve_with_graph_traversal("What is zeta?", "s1", top_k=2, use_graph=False)
+    assert "http://s/e" in [doc["url"] for doc in docs]
+    # fusion ranks the hits but leaves the cosine similarity in score
+    vector_docs = [doc for doc in docs if doc["type"] == "vector_search"]
+    keyword_docs = [doc for doc in docs if doc["type"] == "keyword_search"]
+    assert all(0.0 < doc["score"] <= 1.0 + 1e-6 for doc in vector_docs)
+    assert all(doc["score"] == 0.0 for doc in keyword_docs)
+    assert [doc["rrf_score"] for doc in docs] == sorted((doc["rrf_score"] for doc in docs), reverse=True)
+
+    graph_rag.lexical_index = None
+    docs = graph_rag.retrieve_with_graph_traversal("What is zeta?", "s1", top_k=1, use_graph=False)
+    assert all(doc["type"] == "vector_search" for doc in docs)
+
+
+def test_end_to_end_benchmark_smoke():
+    import rag
+    from benchmarks import bench_e2e
+    from benchmarks.stub_backend import StubOllama
+
+    stub = StubOllama(dim=32)
+    assert np.array_equal(stub.vector("word1 word2"), stub.vector("Word2, word1"))
+
+    previous = rag.ollama
+    results = bench_e2e.run([20], links=3, latency=0.0, queries=5, dim=32, chat_latency=0.0)
+    assert rag.ollama is previous
+
+    result = results[0]
+    assert result["crawl"]["pages"] == 20 and result["index"]["documents"] == 20
+    assert result["index"]["chunks"] >= 20
+    assert result["answer"]["generated"] == 5
+    for section in ("qdrant_query", "kuzu_neighborhoods", "answer"):
+        assert result[section]["p50_ms"] <= result[section]["p99_ms"]
+    assert bench_e2e.flatten(result)["index.chunks_per_second"] > 0
+
+
+def test_stream_index_rerun_is_idempotent(tmp_path, monkeypatch, capsys):
+    import rag
+    monkeypatch.setattr(rag.ollama, "embed", _stub_embed)
+    graph_rag = GraphRAG(
+        vector_size=4,
+        kuzu_db_path=str(tmp_path / "kuzu"),
+        qdrant_path=str(tmp_path / "qdrant"),
+        embedding_cache_path=None,
+        lexical_index_path=str(tmp_path / "lexical")
+    )
+    with SyntheticSite(pages=50, links_per_page=3, words=50) as site:
+        for _ in range(2):
+            assert graph_rag.stream_index_from_crawler(site.url, "s1", max_depth=2, parse_workers=0)
+
+    assert graph_rag.graph_db.show("MATCH ()-[r:hyprlink]->() RETURN count(r)") == [[12]]
+    assert graph_rag.graph_db.show("MATCH (n:links) RETURN count(n)") == [[13]]
+    assert "error" not in capsys.readouterr().out.lower()
+
+
+def test_graph_rag_opens_stores_on_first_use(tmp_path):
+    graph_rag = GraphRAG(
+        kuzu_db_path=str(tmp_path / "kuzu"),
+        qdrant_path=str(tmp_path / "qdrant"),
+        embedding_cache_path=str(tmp_path / "embeddings"),
+        lexical_index_path=str(tmp_path / "lexical")
+    )
+    graph_rag.flush()
+    assert list(tmp_path.iterdir()) == []
+
+    assert graph_rag.lexical_index is graph_rag.lexical_index
+    assert len(graph_rag.embedding_cache) == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["embeddings", "lexical"]